@@ -0,0 +1,126 @@
+"""Benchmark cases for all simulators.
+
+Each function yields tuples (name, params, run) where `run()` performs one
+simulation and returns its trajectory. Jump and step counts are read from
+the trajectory metadata by the runner.
+"""
+from functools import partial
+import numpy as np
+from models.networks import Network, Schedule, repressilator, toggle_switch
+from models_solution import BurstyBase, BurstyGRN, HybridGRN, LimitGRN
+
+# Horizon lengths and grid densities (time points per time unit)
+HORIZONS = [10, 100, 1000]
+DENSITIES = [1, 100]
+
+# Sizes of random sparse networks
+SIZES = [10, 100, 500, 2000]
+
+
+def random_network(n_genes, n_regulators=2, seed=0):
+    """Random sparse network with a few regulators per gene."""
+    rng = np.random.default_rng(seed)
+    targets = np.repeat(np.arange(n_genes), n_regulators)
+    regulators = rng.integers(n_genes, size=targets.size)
+    weights = rng.choice([-10, 5], size=targets.size)
+    return Network.from_edges(n_genes, np.stack([regulators, targets], 1),
+        weights, basal=-1)
+
+
+def time_grid(horizon, density):
+    """Time points with given horizon and density."""
+    return np.linspace(0, horizon, int(horizon * density) + 1)
+
+
+def bursty_base(quick=False):
+    """Exact simulation of a single gene."""
+    model = BurstyBase(burst_frequency=10)
+    for horizon in HORIZONS[:2] if quick else HORIZONS:
+        for density in DENSITIES:
+            time = time_grid(horizon, density)
+            params = {'horizon': horizon, 'density': density}
+            yield 'BurstyBase.simulate', params, \
+                partial(model.simulate, time, seed=0)
+
+
+def bursty_grn(quick=False):
+    """Exact simulation of small and large networks."""
+    networks = [('toggle_switch', toggle_switch),
+        ('repressilator', repressilator)]
+    for name, network in networks:
+        model = BurstyGRN(network)
+        for horizon in HORIZONS[:2] if quick else HORIZONS:
+            for density in DENSITIES:
+                for bound in ['global', 'local']:
+                    time = time_grid(horizon, density)
+                    params = {'network': name, 'horizon': horizon,
+                        'density': density, 'bound': bound}
+                    yield 'BurstyGRN.simulate', params, \
+                        partial(model.simulate, time, seed=0, bound=bound)
+
+    # High burst frequencies (exact and approximate)
+    model = BurstyGRN(repressilator, burst_frequency_max=500,
+        burst_size=2/500)
+    time = time_grid(10, 1)
+    for method in ['thinning', 'tau_leap']:
+        params = {'network': 'repressilator', 'burst_frequency_max': 500,
+            'horizon': 10, 'density': 1, 'method': method}
+        yield 'BurstyGRN.simulate', params, \
+            partial(model.simulate, time, seed=0, method=method)
+
+    # One fast and two slow genes (hybrid and exact)
+    b, k1 = np.array([0.002, 0.5, 0.5]), np.array([500, 2, 2])
+    params = {'network': 'repressilator', 'burst_frequency_max': [500, 2, 2],
+        'horizon': 10, 'density': 1}
+    for cls in [HybridGRN, BurstyGRN]:
+        model = cls(repressilator, burst_size=b, burst_frequency_max=k1)
+        yield f'{cls.__name__}.simulate', params, \
+            partial(model.simulate, time, seed=0)
+
+    # Stimulus switching on a repressed cascade (per-segment bounds)
+    network = Network.from_edges(10, [(i, i+1) for i in range(9)], 8,
+        basal=-6, sparse=False)
+    schedule = Schedule.stimulus([0, 5], [0, 1], np.eye(10)[0] * 10)
+    model = BurstyGRN(network, burst_frequency_max=20, schedule=schedule)
+    for bound in ['global', 'local']:
+        params = {'network': 'stimulus_cascade', 'horizon': 10,
+            'density': 1, 'bound': bound}
+        yield 'BurstyGRN.simulate', params, \
+            partial(model.simulate, time, seed=0, bound=bound)
+        params = {'network': 'stimulus_cascade', 'n_cells': 100,
+            'horizon': 10, 'density': 1, 'bound': bound}
+        yield 'BurstyGRN.simulate_population', params, \
+            partial(model.simulate_population, time, 100, seed=0,
+                bound=bound)
+
+    # Random sparse networks (short horizon)
+    for n_genes in SIZES[:2] if quick else SIZES:
+        model = BurstyGRN(random_network(n_genes))
+        time = time_grid(10, 1)
+        for method, bound in [('thinning', 'global'), ('thinning', 'local'),
+            ('next_reaction', 'global')]:
+            params = {'network': 'random', 'n_genes': n_genes, 'horizon': 10,
+                'density': 1, 'method': method, 'bound': bound}
+            yield 'BurstyGRN.simulate', params, partial(model.simulate,
+                time, seed=0, method=method, bound=bound)
+
+
+def limit_grn(quick=False):
+    """Deterministic limit model."""
+    networks = [('repressilator', repressilator)]
+    networks += [(f'random_{n}', random_network(n)) for n in SIZES[:2]]
+    for name, network in networks:
+        model = LimitGRN(network)
+        for horizon in HORIZONS[:2]:
+            for density in DENSITIES:
+                for method in ['euler', 'RK45', 'LSODA']:
+                    if quick and method == 'euler' and horizon > 10:
+                        continue
+                    time = time_grid(horizon, density)
+                    params = {'network': name, 'horizon': horizon,
+                        'density': density, 'method': method}
+                    yield 'LimitGRN.simulate', params, \
+                        partial(model.simulate, time, method=method)
+
+
+SUITES = [bursty_base, bursty_grn, limit_grn]
@@ -0,0 +1,132 @@
+"""Run the benchmark suite and save results as JSON.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run [--quick] [--output FILE] [--compare FILE]
+
+For each case, the best wall time of several runs is reported together
+with jumps per second and phantom ratio (exact simulations), steps per
+second (ODE simulations) and peak memory (measured with `tracemalloc` in
+a separate run). Use `--compare` with a previous result file to track
+performance regressions between versions.
+"""
+import argparse
+import json
+import platform
+import sys
+import time as clock
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import scipy
+import models
+from benchmarks.cases import SUITES
+
+
+def measure(run, repeat=3):
+    """Time a benchmark case and compute its metrics."""
+    # Warm-up run (also used to get metadata)
+    sim = run()
+    times = []
+    for _ in range(repeat):
+        start = clock.perf_counter()
+        run()
+        times.append(clock.perf_counter() - start)
+    wall = min(times)
+
+    # Peak memory in a separate run
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {'time': wall, 'peak_memory': peak}
+    meta = getattr(sim, 'meta', {})
+    if 'n_jumps' in meta:
+        n_jumps = np.atleast_1d(meta['n_jumps']).astype(float)
+        if n_jumps.size == 2:
+            phantom, total = n_jumps[0], np.sum(n_jumps)
+        else:
+            phantom, total = 0.0, np.sum(n_jumps)
+        result['jumps'] = int(total)
+        result['jumps_per_s'] = total / wall
+        result['phantom_ratio'] = phantom / max(total, 1)
+    if 'n_steps' in meta:
+        result['steps'] = int(meta['n_steps'])
+        result['steps_per_s'] = meta['n_steps'] / wall
+    return result
+
+
+def describe(result):
+    """One-line summary of a result."""
+    params = ', '.join(f'{k}={v}' for k, v in result['params'].items())
+    msg = f'{result["name"]}({params}): {result["time"]:.4f}s'
+    if 'jumps_per_s' in result:
+        msg += (f', {result["jumps_per_s"]:.3g} jumps/s'
+            f' ({100*result["phantom_ratio"]:.1f}% phantom)')
+    if 'steps_per_s' in result:
+        msg += f', {result["steps_per_s"]:.3g} steps/s'
+    msg += f', peak {result["peak_memory"]/2**20:.2f} MiB'
+    return msg
+
+
+def case_key(result):
+    """Identify a benchmark case by its name and parameters."""
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(results, path):
+    """Print time ratios with respect to a previous result file."""
+    with open(path) as f:
+        old = {case_key(r): r for r in json.load(f)['results']}
+    for r in results:
+        if case_key(r) in old:
+            ratio = r['time'] / old[case_key(r)]['time']
+            flag = ' <- slower' if ratio > 1.2 else ''
+            print(f'x{ratio:.2f} {describe(r)}{flag}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--quick', action='store_true',
+        help='run a reduced set of cases')
+    parser.add_argument('--repeat', type=int, default=3,
+        help='number of timed runs per case')
+    parser.add_argument('--filter', default='',
+        help='only run cases whose name contains this string')
+    parser.add_argument('--output', default='benchmark_results.json',
+        help='result file (JSON)')
+    parser.add_argument('--compare', default=None,
+        help='previous result file to compare with')
+    args = parser.parse_args(argv)
+
+    results = []
+    for suite in SUITES:
+        for name, params, run in suite(quick=args.quick):
+            if args.filter not in name:
+                continue
+            result = {'name': name, 'params': params}
+            result.update(measure(run, args.repeat))
+            results.append(result)
+            print(describe(result), flush=True)
+
+    info = {
+        'version': models.__version__,
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'quick': args.quick,
+    }
+    with open(args.output, 'w') as f:
+        json.dump({'info': info, 'results': results}, f, indent=2)
+    print(f'Results saved in {args.output}')
+
+    if args.compare is not None:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,8 +9,12 @@ from importlib.metadata import version as _version
 from models.bursty_base import BurstyBase
 from models.bursty_grn import BurstyGRN
 from models.limit_grn import LimitGRN
+from models.ensemble import Ensemble
+from models.cache import SimulationCache
+from models.trajectory import Trajectory, TrajectoryBatch
 
-__all__ = ['BurstyBase', 'BurstyGRN', 'LimitGRN']
+__all__ = ['BurstyBase', 'BurstyGRN', 'Ensemble', 'LimitGRN',
+    'SimulationCache', 'Trajectory', 'TrajectoryBatch']
 
 try:
     __version__ = _version('models')
@@ -17,6 +17,24 @@ def check_time_points(time):
     return time
 
 
+def check_cell_time_points(time, n_cells):
+    """Check and return time points given for each cell, with shape
+    (n_cells, n_times), or shared by all cells (1D array)."""
+    if np.ndim(time) < 2:
+        return check_time_points(time).reshape((-1,))
+    time = np.array(time, dtype=float)
+    if time.ndim > 2 or time.shape[0] != n_cells:
+        msg = f'Time points must be a 1D array or have shape ({n_cells}, n).'
+        raise ValueError(msg)
+    if np.any(np.diff(time, axis=1) < 0):
+        msg = 'Time points must be given in increasing order.'
+        raise ValueError(msg)
+    if np.any(time < 0):
+        msg = 'Time points must be nonnegative.'
+        raise ValueError(msg)
+    return time
+
+
 def check_init_state(init_state, shape=None):
     """Check and return initial state for trajectory simulations."""
     init_state = np.array(init_state, dtype=float)
@@ -1,14 +1,7 @@
 """Simulation of the Bursty model for a single gene with no feedback."""
 import numpy as np
 import models._utils as utils
-
-
-class Trajectory:
-    """Store single-cell gene expression trajectories."""
-
-    def __init__(self, t, x):
-        self.t = t  # Time points
-        self.x = x  # Protein levels
+from models.trajectory import Trajectory
 
 
 class BurstyBase:
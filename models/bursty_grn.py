@@ -1,17 +1,10 @@
 """Simulation of the Bursty model for a gene regulatory network."""
 import numpy as np
 import models._utils as utils
+from models.trajectory import Trajectory
 from models.networks import Network, kon_sigmoid
 
 
-class Trajectory:
-    """Store single-cell gene expression trajectories."""
-
-    def __init__(self, t, x):
-        self.t = t  # Time points
-        self.x = x  # Protein levels
-
-
 class BurstyGRN:
     """Bursty model for a GRN with any number of interacting genes."""
 
@@ -0,0 +1,171 @@
+"""Content-addressed cache for simulation results on local disk."""
+import hashlib
+import inspect
+import os
+import tempfile
+import numpy as np
+from scipy.sparse import issparse
+import models._utils as utils
+from models.trajectory import Trajectory
+
+
+def _update(h, value):
+    """Feed a value into the hash object `h` (stable across sessions)."""
+    if isinstance(value, np.generic):
+        value = value.item()  # NumPy scalars are hashed as Python scalars
+    if value is None or isinstance(value, (bool, int, float, complex, str)):
+        h.update(f'{type(value).__name__}:{value!r};'.encode())
+    elif issparse(value):
+        value = value.tocsr()
+        value.sum_duplicates()
+        h.update(b'sparse;')
+        _update(h, value.shape)
+        for a in [value.data, value.indices, value.indptr]:
+            _update(h, a)
+    elif isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        h.update(f'array:{value.dtype.str}:{value.shape};'.encode())
+        h.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(f'{type(value).__name__}:{len(value)};'.encode())
+        for v in value:
+            _update(h, v)
+    elif isinstance(value, dict):
+        h.update(f'dict:{len(value)};'.encode())
+        for k in sorted(value):
+            _update(h, k)
+            _update(h, value[k])
+    elif isinstance(value, np.random.SeedSequence):
+        _update(h, (value.entropy, value.spawn_key, value.pool_size))
+    elif hasattr(value, '__dict__'):
+        # Objects such as `Network` are described by their attributes
+        h.update(f'{type(value).__qualname__};'.encode())
+        _update(h, vars(value))
+    else:
+        msg = f'Cannot hash object of type {type(value).__name__}.'
+        raise TypeError(msg)
+
+
+class SimulationCache:
+    """Cache simulation results as memory-mapped trajectory files.
+
+    Results are indexed by a hash of the model class, its parameters
+    (including the network `basal` and `inter` arrays), the time points,
+    the initial state, the seed and other options of `model.simulate`. Cache
+    hits return a trajectory whose array `x` is memory-mapped (read-only),
+    with the same metadata as the simulated one.
+    The total size of the cache is limited by `max_bytes`: the least
+    recently used results are evicted first.
+
+    Simulations are only cached when they are reproducible, i.e. when the
+    seed is given (or when the model is deterministic, such as `LimitGRN`).
+    """
+
+    def __init__(self, path, max_bytes=2**30):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0  # Number of results read from the cache
+        self.misses = 0  # Number of results computed
+        os.makedirs(path, exist_ok=True)
+
+    def key(self, model, time, init_state=None, seed=None, **kwargs):
+        """Compute the cache key of a simulation."""
+        h = hashlib.sha256()
+        cls = type(model)
+        _update(h, f'{cls.__module__}.{cls.__qualname__}')
+        _update(h, vars(model))
+        _update(h, utils.check_time_points(time))
+        _update(h, None if init_state is None else np.asarray(init_state,
+            dtype=float))
+        _update(h, seed)
+        _update(h, kwargs)
+        return h.hexdigest()
+
+    def simulate(self, model, time, init_state=None, seed=None, **kwargs):
+        """Simulate using `model.simulate`, or read the result from cache."""
+        time = utils.check_time_points(time).reshape((-1,))
+        kwargs.pop('verb', None)
+        params = inspect.signature(model.simulate).parameters
+        if init_state is not None:
+            kwargs['init_state'] = init_state
+        if 'seed' in params:
+            kwargs['seed'] = seed
+
+        # Only reproducible simulations are cached
+        cacheable = (seed is None and 'seed' not in params) or \
+            isinstance(seed, (int, np.integer, np.random.SeedSequence))
+        if not cacheable:
+            self.misses += 1
+            return model.simulate(time, **kwargs)
+
+        # Cache hit: memory-mapped result with its metadata
+        file = os.path.join(self.path, f'{self.key(model, time, **kwargs)}'
+            '.traj')
+        if os.path.exists(file):
+            self.hits += 1
+            os.utime(file)  # Mark as recently used
+            return Trajectory.load(file)
+
+        # Cache miss: simulate and store the result
+        self.misses += 1
+        sim = model.simulate(time, **kwargs)
+        if isinstance(sim, Trajectory):
+            self._store(file, sim)
+        return sim
+
+    def _store(self, file, sim):
+        """Write a result atomically and evict old results if needed."""
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        os.close(fd)
+        sim.save(tmp)
+        os.replace(tmp, file)
+        self.evict()
+
+    def _entries(self):
+        """List cached results as (last use, size, file)."""
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith('.traj'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    @property
+    def nbytes(self):
+        """Total size of cached results."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_bytes=None):
+        """Remove least recently used results until below `max_bytes`."""
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, file in entries:
+            if total <= max_bytes:
+                break
+            os.remove(file)
+            total -= size
+
+    def clear(self):
+        """Remove all cached results and reset counters."""
+        self.evict(max_bytes=0)
+        self.hits, self.misses = 0, 0
+
+
+# Tests
+if __name__ == '__main__':
+    from models_solution import BurstyGRN, LimitGRN
+    from models.networks import toggle_switch
+    time = np.linspace(0, 50, 1001)
+    with tempfile.TemporaryDirectory() as folder:
+        cache = SimulationCache(folder, max_bytes=40000)
+        for model in [BurstyGRN(toggle_switch), LimitGRN(toggle_switch)]:
+            sim1 = cache.simulate(model, time, seed=0)
+            sim2 = cache.simulate(model, time, seed=0)
+            print(np.array_equal(sim1.x, sim2.x), type(sim2.x).__name__,
+                sim1.meta.keys() == sim2.meta.keys())
+        sim = cache.simulate(BurstyGRN(toggle_switch), time, seed=1)
+        sim = cache.simulate(BurstyGRN(toggle_switch), time, seed=np.int64(1))
+        print(cache.hits, cache.misses, cache.nbytes, len(os.listdir(folder)))
@@ -0,0 +1,118 @@
+"""Simulation of scRNA-seq count matrices from a GRN model.
+
+Each cell is sampled at its own time point, using the batch simulation of
+the model (`simulate_population` with one time point per cell), and the
+expression levels are converted into integer counts by a vectorized readout
+model. Cells are processed by chunks, so that only the sparse count matrix
+grows with the number of cells.
+"""
+import numpy as np
+from scipy.sparse import csr_array, vstack
+import models._utils as utils
+
+# Readout models
+READOUTS = ['poisson', 'negative_binomial']
+
+
+def readout(x, rng: np.random.Generator, method='poisson', scale=1.0,
+    efficiency=1.0, dispersion=1.0, dropout=0.0):
+    """Convert expression levels `x` (n_cells, n_genes) into counts.
+
+    The mean count of gene i in cell c is `efficiency[c] * scale[i] * x[c,i]`
+    where `efficiency` is the capture efficiency of each cell (scalar value
+    or shape (n_cells,)) and `scale` converts levels into molecules (scalar
+    value or shape (n_genes,)). Counts then follow:
+
+    - `poisson`: a Poisson distribution;
+    - `negative_binomial`: a negative binomial distribution with shape
+      `dispersion` (Gamma-Poisson mixture, variance = mean + mean^2/shape).
+
+    Finally, each count is set to zero with probability `dropout` (scalar
+    value or shape (n_genes,)).
+    """
+    efficiency = np.asarray(efficiency, dtype=float)
+    if efficiency.ndim == 1:
+        efficiency = efficiency[:, None]
+    mean = efficiency * scale * x
+    if method == 'poisson':
+        counts = rng.poisson(mean)
+    elif method == 'negative_binomial':
+        shape = np.broadcast_to(dispersion, mean.shape)
+        counts = rng.poisson(rng.gamma(shape, mean / shape))
+    else:
+        msg = f'Readout must be one of: {", ".join(READOUTS)}.'
+        raise ValueError(msg)
+    if np.any(np.asarray(dropout) > 0):
+        counts[rng.random(counts.shape) < dropout] = 0
+    return counts
+
+
+def simulate_counts(model, time, init_state=None, seed=None, verb=False,
+    chunk_size=10000, dtype=np.int32, moments=None, return_counts=True,
+    **options):
+    """Simulate a count matrix with one cell per time point in `time`.
+
+    Return a sparse array of shape (n_cells, n_genes) in CSR format. The
+    `model` must provide `simulate_population` with time points given for
+    each cell (e.g. `BurstyGRN`), and `init_state` is shared by all cells.
+    Keyword arguments are passed to `readout`.
+
+    If `moments` is a `RunningMoments` object, it is updated with the
+    counts of each chunk grouped by time point: use `return_counts=False`
+    to only compute these bulk moments (the function then returns None).
+    """
+    # Time points of cells (in any order)
+    time = utils.check_cell_time_points(np.reshape(time, (-1, 1)),
+        np.size(time))[:, 0]
+    n_cells = time.size
+    rng = np.random.default_rng(seed)
+
+    # Check readout options before simulating
+    method = options.get('method', 'poisson')
+    if method not in READOUTS:
+        msg = f'Readout must be one of: {", ".join(READOUTS)}.'
+        raise ValueError(msg)
+    efficiency = np.broadcast_to(options.pop('efficiency', 1.0), (n_cells,))
+
+    # Simulate and read out cells by chunks
+    blocks = []
+    for start in range(0, n_cells, chunk_size):
+        cells = slice(start, start + chunk_size)
+        n = time[cells].size
+        sim = model.simulate_population(time[cells, None], n,
+            init_state=init_state, seed=rng)
+        counts = readout(sim.x[:, 0], rng, efficiency=efficiency[cells],
+            **options)
+        if moments is not None:
+            moments.update(time[cells], counts)
+        if return_counts:
+            blocks.append(csr_array(counts.astype(dtype)))
+        if verb:
+            print(f'Simulated {start + n}/{n_cells} cells')
+
+    n_genes = model.n_genes
+    if not return_counts:
+        return None
+    if not blocks:
+        return csr_array((0, n_genes), dtype=dtype)
+    return csr_array(vstack(blocks, format='csr'))
+
+
+# Tests
+if __name__ == '__main__':
+    from models_solution import BurstyGRN
+    from models.networks import toggle_switch
+    model = BurstyGRN(toggle_switch)
+    time = np.repeat(np.linspace(0, 20, 10), 1000)
+    counts = simulate_counts(model, time, seed=0, scale=5, verb=True)
+    print(counts.shape, counts.dtype, counts.nnz)
+    print(counts[-1000:].mean(axis=0))
+    # Bulk moments only
+    from models.moments import RunningMoments
+    moments = RunningMoments(model.n_genes)
+    simulate_counts(model, time, seed=0, scale=5, moments=moments,
+        return_counts=False)
+    print(moments.mean[-1], moments.var()[-1])
+    counts = simulate_counts(model, time, seed=0, scale=5,
+        method='negative_binomial', dispersion=2, efficiency=0.5, dropout=0.1)
+    print(counts[-1000:].mean(axis=0))
@@ -0,0 +1,79 @@
+"""Convergence diagnostics for parallel Markov chains.
+
+Chains are given as arrays of shape (n_chains, n_draws, ...) where trailing
+dimensions (e.g. genes) are treated independently.
+"""
+import numpy as np
+
+
+def split_rhat(chains):
+    """Potential scale reduction factor (split R-hat).
+
+    Each chain is split in two halves so that non-stationary chains are
+    detected even when all chains follow the same trend. Values close to 1
+    indicate that the chains have forgotten their initial states.
+    """
+    chains = np.asarray(chains, dtype=float)
+    n = chains.shape[1] // 2
+    if n < 2:
+        msg = 'Chains must contain at least 4 draws.'
+        raise ValueError(msg)
+    halves = np.concatenate([chains[:, :n], chains[:, -n:]])
+    w = np.mean(np.var(halves, axis=1, ddof=1), axis=0)
+    b = np.var(np.mean(halves, axis=1), axis=0, ddof=1)
+    var_plus = (n - 1)/n * w + b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rhat = np.sqrt(var_plus / w)
+    # Constant chains (e.g. genes that are always off) are converged
+    return np.where(var_plus > 0, rhat, 1.0)
+
+
+def integrated_time(chains):
+    """Integrated autocorrelation time (in number of draws).
+
+    The autocorrelation is estimated by combining all chains and summed
+    using the initial positive sequence estimator of Geyer (1992).
+    """
+    chains = np.asarray(chains, dtype=float)
+    n_chains, n = chains.shape[:2]
+
+    # Autocovariance of each chain (using FFT)
+    y = chains - np.mean(chains, axis=1, keepdims=True)
+    f = np.fft.rfft(y, n=2*n, axis=1)
+    acov = np.fft.irfft(f * np.conj(f), n=2*n, axis=1)[:, :n] / n
+
+    # Combined autocorrelation
+    w = np.mean(acov[:, 0], axis=0) * n/(n - 1)
+    var_plus = (n - 1)/n * w
+    if n_chains > 1:
+        var_plus = var_plus + np.var(np.mean(chains, axis=1), axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rho = 1 - (w - np.mean(acov, axis=0)) / var_plus
+    rho[0] = 1
+
+    # Sum of consecutive pairs until the first negative one
+    m = n // 2
+    p = rho[:2*m].reshape((m, 2) + rho.shape[1:]).sum(axis=1)
+    positive = np.cumprod(p > 0, axis=0)
+    tau = -1 + 2*np.sum(p * positive, axis=0)
+    # Lower cap as in Stan (effective size at most n*log10(n) per chain)
+    return np.where(var_plus > 0, np.maximum(tau, 1/np.log10(n)), 1.0)
+
+
+def effective_sample_size(chains):
+    """Effective number of independent draws for all chains combined."""
+    chains = np.asarray(chains)
+    return chains.shape[0] * chains.shape[1] / integrated_time(chains)
+
+
+# Tests
+if __name__ == '__main__':
+    # Parallel AR(1) chains with known autocorrelation time (1+a)/(1-a)
+    rng = np.random.default_rng(0)
+    a, n_chains, n = 0.9, 4, 10000
+    x = np.zeros((n_chains, n))
+    for k in range(1, n):
+        x[:, k] = a*x[:, k-1] + rng.standard_normal(n_chains)
+    print(split_rhat(x))
+    print(integrated_time(x), (1+a)/(1-a))
+    print(effective_sample_size(x))
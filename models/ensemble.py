@@ -0,0 +1,163 @@
+"""Parallel simulation of independent cells using a process pool."""
+import inspect
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import models._utils as utils
+from models.trajectory import TrajectoryBatch, model_meta
+
+# Worker state (set once per process by `init_worker`)
+worker_state = {}
+
+
+def init_worker(state):
+    """Store the state shared by all tasks of a worker process."""
+    worker_state.clear()
+    worker_state.update(state)
+
+
+def worker_pool(n_workers, state):
+    """Process pool whose workers store `state` (see `init_worker`).
+
+    The number of workers defaults to the number of CPUs. With a single
+    worker, the state is stored in the current process and None is
+    returned: tasks should then be run directly.
+
+    NB: When using many workers, make sure that NumPy does not also use
+    several threads per worker (e.g. set `OMP_NUM_THREADS=1`).
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if n_workers == 1:
+        init_worker(state)
+        return None
+    return ProcessPoolExecutor(n_workers, initializer=init_worker,
+        initargs=(state,))
+
+
+def _run_chunk(cells, init_states, seeds):
+    """Simulate a chunk of cells and write them into the shared array."""
+    model, time = worker_state['model'], worker_state['time']
+    shm = shared_memory.SharedMemory(name=worker_state['name'])
+    try:
+        traj = np.ndarray(worker_state['shape'], dtype=worker_state['dtype'],
+            buffer=shm.buf)
+        for i, x0, seed in zip(cells, init_states, seeds):
+            kwargs = dict(worker_state['kwargs'])
+            if x0 is not None:
+                kwargs['init_state'] = x0
+            if seed is not None:
+                kwargs['seed'] = seed
+            traj[i] = model.simulate(time, **kwargs).x
+        del traj  # Release the buffer before closing
+    finally:
+        shm.close()
+    return len(cells)
+
+
+class Ensemble:
+    """Simulate independent cells in parallel using a process pool.
+
+    The model can be any object with a `simulate(time, init_state, ...)`
+    method, such as `BurstyBase`, `BurstyGRN` or `LimitGRN`. Each cell uses
+    its own seed spawned from `np.random.SeedSequence(seed)`, so results do
+    not depend on the number of workers or on the chunk size. Cells are
+    written by the workers directly into a shared memory array (see
+    `worker_pool` about threads used by NumPy in workers).
+    """
+
+    def __init__(self, model, n_workers=None, chunk_size=None):
+        self.model = model
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+
+    def simulate(self, time, n_cells, init_state=None, seed=None,
+        verb=False, dtype=float, **kwargs):
+        """Simulate `n_cells` independent cells at given time points.
+
+        The trajectory array `x` has shape (n_cells, n_times, n_genes), or
+        (n_cells, n_times) for single-gene models, and is stored as `dtype`
+        (e.g. float32 to halve memory usage). Additional keyword arguments
+        are passed to `model.simulate`.
+        """
+        model = self.model
+        time = utils.check_time_points(time).reshape((-1,))
+
+        # Shape of the result array
+        n_genes = getattr(model, 'n_genes', None)
+        if n_genes is None:
+            shape = (n_cells, time.size)
+        else:
+            shape = (n_cells, time.size, n_genes)
+
+        # Initial states of all cells
+        if init_state is None:
+            init_states = [None] * n_cells
+        else:
+            init_state = utils.check_init_state(init_state)
+            if np.shape(init_state) in [shape[2:], ()]:
+                init_states = [init_state] * n_cells
+            elif np.shape(init_state) == (n_cells,) + shape[2:]:
+                init_states = list(init_state)
+            else:
+                msg = ('Initial state must be shared by all cells or given '
+                    'for each cell.')
+                raise ValueError(msg)
+
+        # Independent seeds for all cells (if the model is stochastic)
+        if 'seed' in inspect.signature(model.simulate).parameters:
+            seeds = np.random.SeedSequence(seed).spawn(n_cells)
+        else:
+            seeds = [None] * n_cells
+
+        # Split cells into chunks
+        n_workers = self.n_workers
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        chunk_size = self.chunk_size
+        if chunk_size is None:
+            chunk_size = max(1, int(np.ceil(n_cells / (4 * n_workers))))
+        chunks = [slice(i, i + chunk_size)
+            for i in range(0, n_cells, chunk_size)]
+
+        # Shared result array
+        dtype = np.dtype(dtype)
+        nbytes = max(1, int(np.prod(shape)) * dtype.itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        try:
+            state = {'model': model, 'time': time, 'kwargs': kwargs,
+                'name': shm.name, 'shape': shape, 'dtype': dtype}
+            pool = worker_pool(n_workers, state)
+            if pool is None:
+                for c in chunks:
+                    _run_chunk(range(n_cells)[c], init_states[c], seeds[c])
+            else:
+                with pool:
+                    futures = [pool.submit(_run_chunk, range(n_cells)[c],
+                        init_states[c], seeds[c]) for c in chunks]
+                    for future in futures:
+                        future.result()
+            traj = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+        if verb:
+            print(f'Simulated {n_cells} cells using {n_workers} workers '
+                f'({len(chunks)} chunks)')
+
+        meta = model_meta(model, seed=seed)
+        return TrajectoryBatch(time, traj, meta=meta)
+
+
+# Tests
+if __name__ == '__main__':
+    from models_solution import BurstyGRN
+    from models.networks import toggle_switch
+    model = BurstyGRN(toggle_switch)
+    time = np.linspace(0, 10, 3)
+    sim1 = Ensemble(model, n_workers=1).simulate(time, 100, seed=0)
+    sim2 = Ensemble(model, n_workers=4).simulate(time, 100, seed=0, verb=True)
+    print(np.array_equal(sim1.x, sim2.x))
+    print(sim2.x.mean(axis=0))
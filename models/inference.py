@@ -0,0 +1,365 @@
+"""Likelihood-free parameter inference from scRNA-seq count data.
+
+Parameters are calibrated by Approximate Bayesian Computation with
+Sequential Monte Carlo (ABC-SMC, Beaumont et al. 2009): populations of
+weighted particles are moved towards the posterior with decreasing
+tolerances on the distance between simulated and observed summaries.
+
+Each particle is simulated with the batch simulator of the model (see
+`models.counts.simulate_counts`), by chunks of cells whose moments are
+accumulated in streaming form, so that hopeless particles can be rejected
+before all cells are simulated. Particles are spread across a process pool.
+"""
+import time as clock
+import numpy as np
+from models.counts import simulate_counts
+from models.ensemble import worker_pool, worker_state
+from models.moments import RunningMoments, group_moments
+
+
+def summary_statistics(moments: RunningMoments):
+    """Summary vector of moments grouped by time point.
+
+    Concatenate means, standard deviations and correlations between genes
+    (upper triangle) of all groups.
+    """
+    mean = moments.mean
+    var = np.maximum(np.nan_to_num(moments.var()), 0)
+    stats = [mean.ravel(), np.sqrt(var).ravel()]
+    if moments.n_genes > 1:
+        cov = np.nan_to_num(moments.cov())
+        std = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / (std[:, :, None] * std[:, None, :])
+        i, j = np.triu_indices(moments.n_genes, 1)
+        stats.append(np.nan_to_num(corr[:, i, j]).ravel())
+    return np.concatenate(stats)
+
+
+def stratified_order(time):
+    """Order of cells interleaving time points in proportion to group sizes.
+
+    Every block of consecutive cells then contains about the same share of
+    each time point, so that summaries of all groups are available early.
+    """
+    _, groups, sizes = np.unique(time, return_inverse=True,
+        return_counts=True)
+    order = np.argsort(groups, kind='stable')
+    rank = np.empty(time.size)
+    rank[order] = np.arange(time.size) - np.repeat(np.cumsum(sizes) - sizes,
+        sizes)
+    return np.argsort((rank + 0.5) / sizes[groups], kind='stable')
+
+
+def chunk_bounds(n_cells, chunk_size):
+    """Bounds of chunks of cells doubling in size from `chunk_size`.
+
+    A chunk absorbs the remaining cells if they are fewer than its own
+    size, so that the number of population runs stays logarithmic.
+    """
+    bounds, size = [0], chunk_size
+    while bounds[-1] < n_cells:
+        stop = bounds[-1] + size
+        bounds.append(stop if n_cells - stop >= size else n_cells)
+        size *= 2
+    return bounds
+
+
+def _evaluate(theta, seed, epsilon, scale, reject):
+    """Simulate a particle and return its distance and number of cells.
+
+    The `seed` (a `SeedSequence`) is spawned for each chunk of cells (see
+    `chunk_bounds`). The distance is infinite if the particle is rejected
+    early, i.e. if the distance of partial summaries exceeds `reject *
+    epsilon`.
+    """
+    model = worker_state['build'](theta)
+    time, (n_groups, observed) = worker_state['time'], worker_state['observed']
+    options = dict(worker_state['options'])
+    efficiency = options.pop('efficiency', 1.0)
+    d = np.inf
+    moments = RunningMoments(model.n_genes, cov=True)
+    bounds = chunk_bounds(time.size, worker_state['chunk_size'])
+    seeds = seed.spawn(len(bounds) - 1)
+    for k, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        if np.ndim(efficiency) > 0:
+            options['efficiency'] = efficiency[start:stop]
+        else:
+            options['efficiency'] = efficiency
+        simulate_counts(model, time[start:stop],
+            init_state=worker_state['init_state'], seed=seeds[k],
+            moments=moments, return_counts=False, **options)
+        if moments.groups.size < n_groups:
+            continue
+        d = distance(summary_statistics(moments), observed, scale)
+        if stop < time.size and d > reject * epsilon:
+            return np.inf, stop
+    return d, time.size
+
+
+def _summarize(theta, seed):
+    """Simulate a particle and return its summaries (all cells)."""
+    model = worker_state['build'](theta)
+    moments = RunningMoments(model.n_genes, cov=True)
+    simulate_counts(model, worker_state['time'],
+        init_state=worker_state['init_state'], seed=seed, moments=moments,
+        return_counts=False, **worker_state['options'])
+    return summary_statistics(moments)
+
+
+def distance(s, s_obs, scale):
+    """Root mean square of scaled differences between summaries."""
+    return np.sqrt(np.mean(((s - s_obs) / scale)**2))
+
+
+class ABCSMC:
+    """Calibrate model parameters from count data by ABC-SMC.
+
+    The function `build(theta)` returns a model (e.g. `BurstyGRN`) from a
+    parameter vector `theta`, for instance by setting `network.basal`,
+    `network.inter` or kinetic parameters. The model must provide
+    `simulate_population` with time points given for each cell, and `build`
+    must be defined at module level to be sent to worker processes. The
+    prior is uniform within `bounds` of shape (n_params, 2): use `build` to
+    transform parameters, e.g. for log-uniform priors.
+
+    Data are given as `counts` (n_cells, n_genes) with the time point of
+    each cell in `time`. Keyword arguments are passed to `readout`. Cells
+    are simulated by chunks doubling in size from `chunk_size`, with time
+    points interleaved (see `stratified_order`) so that every chunk
+    contains all groups and particles can be rejected from the first one.
+    Particles are simulated by a process pool (see `worker_pool`).
+    """
+
+    def __init__(self, build, bounds, counts, time, init_state=None,
+        n_workers=None, chunk_size=100, **options):
+        self.build = build
+        self.bounds = np.array(bounds, dtype=float).reshape((-1, 2))
+        self.time = np.asarray(time, dtype=float).reshape((-1,))
+        self.init_state = init_state
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        self.options = options
+
+        # Simulation order of cells (with per-cell readout options)
+        self.order = stratified_order(self.time)
+        efficiency = options.get('efficiency')
+        if efficiency is not None and np.ndim(efficiency) > 0:
+            self.options = {**options,
+                'efficiency': np.asarray(efficiency)[self.order]}
+
+        # Observed summaries
+        self.observed = summary_statistics(group_moments(self.time, counts,
+            cov=True))
+        self.n_groups = np.unique(self.time).size
+
+        # Results
+        self.populations = []  # Accepted particles of each generation
+        self.n_simulations = 0  # Number of simulated particles (all runs)
+        self.n_early = 0  # Number of particles rejected early
+        self.n_cells = 0  # Number of simulated cells
+        self.wall_time = 0.0
+
+    @property
+    def n_params(self):
+        return self.bounds.shape[0]
+
+    @property
+    def particles_per_second(self):
+        """Throughput of particle simulations (including the prior
+        simulations used to scale summaries)."""
+        return self.n_simulations / max(self.wall_time, 1e-12)
+
+    def prior_sample(self, n, rng: np.random.Generator):
+        """Sample `n` particles from the prior."""
+        low, high = self.bounds[:, 0], self.bounds[:, 1]
+        return low + (high - low) * rng.random((n, self.n_params))
+
+    def in_prior(self, theta):
+        """Test if particles are within the prior support."""
+        low, high = self.bounds[:, 0], self.bounds[:, 1]
+        return np.all((theta >= low) & (theta <= high), axis=-1)
+
+    def run(self, n_particles=100, n_generations=5, alpha=0.5, seed=None,
+        reject=2.0, min_acceptance=0.01, verb=False):
+        """Run ABC-SMC and return the final population.
+
+        The tolerance of each generation is the `alpha` quantile of the
+        distances of the previous one. Particles whose partial distance
+        exceeds `reject` times the tolerance are rejected early. The run
+        stops after `n_generations` or when the acceptance rate falls below
+        `min_acceptance`, which is also checked during each generation:
+        proposals stop after `n_particles / min_acceptance` of them, keeping
+        the particles accepted so far (if any). All populations are stored
+        in `populations`.
+        """
+        rng = np.random.default_rng(seed)
+        seeds = np.random.SeedSequence(seed)
+        # Simulation setting (`observed` = groups and summaries)
+        state = {'build': self.build, 'time': self.time[self.order],
+            'observed': (self.n_groups, self.observed),
+            'init_state': self.init_state, 'chunk_size': self.chunk_size,
+            'options': self.options}
+
+        start = clock.perf_counter()
+        pool = worker_pool(self.n_workers, state)
+        try:
+            # Generation 0: prior samples (also used to scale summaries)
+            theta = self.prior_sample(n_particles, rng)
+            self.scale = self._prior_scale(theta, seeds, pool)
+            d = self._evaluate(theta, seeds, np.inf, pool)
+            population = Population(theta, np.ones(n_particles), d, np.inf)
+            self.populations = [population]
+            if verb:
+                print(self._message(population, 1.0))
+
+            for _ in range(n_generations):
+                epsilon = np.quantile(population.distances, alpha)
+                new, rate = self._generation(population, epsilon,
+                    n_particles, rng, seeds, pool, reject, min_acceptance)
+                if new is None:
+                    if verb:
+                        print(f'Generation {len(self.populations)}: no '
+                            f'particle accepted with epsilon = {epsilon:.4g}')
+                    break
+                population = new
+                self.populations.append(population)
+                if verb:
+                    print(self._message(population, rate))
+                if rate < min_acceptance:
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            self.wall_time += clock.perf_counter() - start
+
+        if verb:
+            print(f'Simulated {self.n_simulations} particles '
+                f'({self.n_early} rejected early, {self.n_cells} cells) at '
+                f'{self.particles_per_second:.1f} particles/s')
+        return population
+
+    def _generation(self, population, epsilon, n_particles, rng, seeds,
+        pool, reject, min_acceptance=0.0):
+        """Sample a population with tolerance `epsilon`.
+
+        Return the population (None if no particle is accepted) and the
+        acceptance rate. Proposals stop early if the acceptance rate is
+        below `min_acceptance` after `n_particles / min_acceptance` of them.
+        """
+        # Gaussian perturbation kernel (twice the weighted covariance)
+        cov = 2 * np.atleast_2d(np.cov(population.theta.T,
+            aweights=population.weights))
+        cov += 1e-12 * np.eye(self.n_params)
+        chol = np.linalg.cholesky(cov)
+
+        accepted, distances = [], []
+        n_proposed = 0
+        batch = n_particles
+        max_proposed = np.inf
+        if min_acceptance > 0:
+            max_proposed = n_particles / min_acceptance
+        while len(accepted) < n_particles and n_proposed < max_proposed:
+            # Resample and perturb particles within the prior
+            k = rng.choice(population.size, batch, p=population.weights)
+            theta = population.theta[k]
+            theta = theta + rng.standard_normal(theta.shape) @ chol.T
+            theta = theta[self.in_prior(theta)]
+            n_proposed += batch
+            if theta.shape[0] == 0:
+                continue
+            d = self._evaluate(theta, seeds, epsilon, pool, reject)
+            keep = d <= epsilon
+            accepted.extend(theta[keep])
+            distances.extend(d[keep])
+        rate = min(len(accepted), n_particles) / n_proposed
+        if not accepted:
+            return None, rate
+        theta = np.array(accepted[:n_particles])
+        d = np.array(distances[:n_particles])
+
+        # Importance weights (uniform prior)
+        diff = theta[:, None, :] - population.theta[None, :, :]
+        z = np.linalg.solve(chol, diff.reshape((-1, self.n_params)).T)
+        kernel = np.exp(-0.5 * np.sum(z**2, axis=0)).reshape(diff.shape[:2])
+        weights = 1 / (kernel @ population.weights)
+        return Population(theta, weights, d, epsilon), rate
+
+    def _evaluate(self, theta, seeds, epsilon, pool, reject=np.inf):
+        """Distances of particles (simulated in parallel)."""
+        args = [(t, s, epsilon, self.scale, reject)
+            for t, s in zip(theta, seeds.spawn(theta.shape[0]))]
+        if pool is None:
+            results = [_evaluate(*a) for a in args]
+        else:
+            results = list(pool.map(_evaluate, *zip(*args)))
+        d = np.array([r[0] for r in results])
+        self.n_simulations += d.size
+        self.n_early += int(np.sum(np.isinf(d)))
+        self.n_cells += sum(r[1] for r in results)
+        return d
+
+    def _prior_scale(self, theta, seeds, pool):
+        """Scale of summaries: median absolute deviation under the prior."""
+        n = min(theta.shape[0], 20)
+        args = theta[:n], seeds.spawn(n)
+        if pool is None:
+            summaries = [_summarize(*a) for a in zip(*args)]
+        else:
+            summaries = list(pool.map(_summarize, *args))
+        self.n_simulations += n
+        self.n_cells += n * self.time.size
+        summaries = np.array(summaries)
+        mad = np.median(np.abs(summaries - np.median(summaries, axis=0)),
+            axis=0)
+        return np.where(mad > 0, mad, 1.0)
+
+    def _message(self, population, rate):
+        """Describe a population."""
+        mean = np.array2string(population.mean(), precision=3)
+        return (f'Generation {len(self.populations) - 1}: epsilon = '
+            f'{population.epsilon:.4g}, acceptance {100*rate:.1f}%, '
+            f'mean {mean}')
+
+
+class Population:
+    """Weighted particles of ABC-SMC with their distances."""
+
+    def __init__(self, theta, weights, distances, epsilon):
+        self.theta = theta
+        self.weights = weights / np.sum(weights)
+        self.distances = distances
+        self.epsilon = epsilon
+
+    @property
+    def size(self):
+        return self.theta.shape[0]
+
+    def mean(self):
+        """Posterior mean of parameters."""
+        return self.weights @ self.theta
+
+    def std(self):
+        """Posterior standard deviation of parameters."""
+        return np.sqrt(self.weights @ (self.theta - self.mean())**2)
+
+
+def _build_toggle_switch(theta):
+    """Toggle switch with unknown basal activities (example)."""
+    from models_solution import BurstyGRN
+    from models.networks import Network
+    network = Network(2)
+    network.basal[:] = theta
+    network.inter[0, 1] = network.inter[1, 0] = -10
+    return BurstyGRN(network, burst_frequency_max=5)
+
+
+# Tests
+if __name__ == '__main__':
+    time = np.repeat([2.0, 10.0], 200)
+    data = simulate_counts(_build_toggle_switch([4, 1]), time, seed=0,
+        scale=5)
+    abc = ABCSMC(_build_toggle_switch, [[0, 6], [0, 6]], data.toarray(),
+        time, n_workers=1, scale=5)
+    population = abc.run(n_particles=50, n_generations=4, seed=1, verb=True)
+    print(population.mean(), population.std())
@@ -0,0 +1,125 @@
+"""Moments of single-cell data grouped by time point (bulk averages).
+
+Cells are grouped by label (typically their time point) and moments of all
+groups are computed in a single pass using sorting and `np.add.reduceat`.
+Moments can also be accumulated by batches of cells, merging the moments
+of each batch into the current ones (Chan et al. parallel algorithm, which
+generalizes Welford's algorithm), so that the full data matrix never has
+to be stored.
+"""
+import numpy as np
+from scipy.sparse import issparse
+
+
+class RunningMoments:
+    """Accumulate the count, mean and (co)variance of cells by group.
+
+    Groups are sorted labels in `groups`. For each group, `mean` has shape
+    (n_genes,) and the covariance matrix (if `cov` is True) has shape
+    (n_genes, n_genes).
+    """
+
+    def __init__(self, n_genes, cov=False):
+        self.n_genes = n_genes
+        self.groups = np.zeros(0)  # Sorted group labels
+        self.count = np.zeros(0, dtype=int)  # Number of cells per group
+        self.mean = np.zeros((0, n_genes))  # Mean per group
+        self._m2 = np.zeros((0, n_genes))  # Sum of squared deviations
+        self._c2 = np.zeros((0, n_genes, n_genes)) if cov else None
+
+    def update(self, labels, x):
+        """Add a batch of cells with group `labels` and data `x`."""
+        if np.size(labels) == 0:
+            return self
+        groups, count, mean, m2, c2 = _batch_moments(labels, x,
+            self._c2 is not None)
+
+        # Align current and new groups
+        all_groups = np.union1d(self.groups, groups)
+        if all_groups.size > self.groups.size:
+            self._resize(all_groups)
+        k = np.searchsorted(self.groups, groups)
+
+        # Merge moments (Chan et al.)
+        n_a, n_b = self.count[k][:, None], count[:, None]
+        n = n_a + n_b
+        delta = mean - self.mean[k]
+        self.mean[k] += delta * n_b / n
+        self._m2[k] += m2 + delta**2 * n_a * n_b / n
+        if c2 is not None:
+            w = (n_a * n_b / n)[:, :, None]
+            self._c2[k] += c2 + w * delta[:, :, None] * delta[:, None, :]
+        self.count[k] += count
+        return self
+
+    def _resize(self, groups):
+        """Insert empty groups."""
+        k = np.searchsorted(groups, self.groups)
+        size = groups.size
+        count = np.zeros(size, dtype=int)
+        mean = np.zeros((size, self.n_genes))
+        m2 = np.zeros((size, self.n_genes))
+        count[k], mean[k], m2[k] = self.count, self.mean, self._m2
+        if self._c2 is not None:
+            c2 = np.zeros((size, self.n_genes, self.n_genes))
+            c2[k] = self._c2
+            self._c2 = c2
+        self.groups, self.count, self.mean, self._m2 = groups, count, mean, m2
+
+    def var(self, ddof=1):
+        """Variance of each gene per group."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._m2 / (self.count[:, None] - ddof)
+
+    def cov(self, ddof=1):
+        """Covariance matrix per group."""
+        if self._c2 is None:
+            msg = 'Covariances are only computed with cov=True.'
+            raise ValueError(msg)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._c2 / (self.count[:, None, None] - ddof)
+
+
+def _batch_moments(labels, x, cov=False):
+    """Count, mean and sums of squared deviations per group (one pass)."""
+    if issparse(x):
+        x = x.toarray()
+    x = np.asarray(x, dtype=float).reshape((np.size(labels), -1))
+    order = np.argsort(labels, kind='stable')
+    labels, x = np.asarray(labels)[order], x[order]
+    groups, start, count = np.unique(labels, return_index=True,
+        return_counts=True)
+    mean = np.add.reduceat(x, start) / count[:, None]
+    y = x - np.repeat(mean, count, axis=0)
+    m2 = np.add.reduceat(y**2, start)
+    c2 = None
+    if cov:
+        c2 = np.add.reduceat(y[:, :, None] * y[:, None, :], start)
+    return groups, count, mean, m2, c2
+
+
+def group_moments(labels, x, cov=False):
+    """Compute moments of data `x` (n_cells, n_genes) grouped by labels.
+
+    Return a `RunningMoments` object that can be updated with more cells.
+    """
+    n_genes = np.shape(x)[1] if np.ndim(x) > 1 else 1
+    return RunningMoments(n_genes, cov=cov).update(labels, x)
+
+
+# Tests
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    labels = rng.integers(5, size=10000)
+    x = rng.normal(labels[:, None], 1 + labels[:, None], size=(10000, 2))
+    m = group_moments(labels, x, cov=True)
+    print(m.groups, m.count)
+    print(m.mean)
+    # Streaming version
+    r = RunningMoments(2, cov=True)
+    for k in range(0, 10000, 999):
+        r.update(labels[k:k+999], x[k:k+999])
+    print(np.allclose(r.mean, m.mean), np.allclose(r.var(), m.var()),
+        np.allclose(r.cov(), m.cov()))
+    print(np.allclose(m.var(), [np.var(x[labels == i], axis=0, ddof=1)
+        for i in range(5)]))
@@ -1,6 +1,24 @@
 """Some pre-defined networks."""
-from models.networks._base import Network, kon_sigmoid
+from models.networks._base import (
+    Network,
+    kon_sigmoid,
+    kon_sigmoid_bound,
+    kon_sigmoid_jacobian,
+    sigmoid_rate,
+    split_interactions,
+)
+from models.networks._schedule import Schedule
 from models.networks.toggle_switch import network as toggle_switch
 from models.networks.repressilator import network as repressilator
 
-__all__ = ['Network', 'kon_sigmoid', 'repressilator', 'toggle_switch']
+__all__ = [
+    'Network',
+    'Schedule',
+    'kon_sigmoid',
+    'kon_sigmoid_bound',
+    'kon_sigmoid_jacobian',
+    'repressilator',
+    'sigmoid_rate',
+    'split_interactions',
+    'toggle_switch',
+]
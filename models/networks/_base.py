@@ -1,18 +1,134 @@
 """Useful functions for defining interactions."""
 import numpy as np
+from scipy.sparse import csr_array, issparse
 from scipy.special import expit
 
 
 class Network:
-    """Store network parameters (`basal` and `inter`)."""
+    """Store network parameters (`basal` and `inter`).
 
-    def __init__(self, n_genes):
+    The interaction matrix is either a dense array or, for large networks
+    with few edges per gene, a sparse array in CSR format.
+    """
+
+    def __init__(self, n_genes, sparse=False):
         self.n_genes = n_genes  # Number of genes
         self.basal = np.zeros(n_genes)  # Basal activities
-        self.inter = np.zeros((n_genes, n_genes))  # Interaction matrix
+        if sparse:
+            self.inter = csr_array((n_genes, n_genes))  # Interaction matrix
+        else:
+            self.inter = np.zeros((n_genes, n_genes))  # Interaction matrix
+
+    @classmethod
+    def from_edges(cls, n_genes, edges, weights, basal=0.0, sparse=True):
+        """Build a network from a list of edges (regulator, target).
+
+        Weights of duplicate edges are summed.
+        """
+        edges = np.array(edges, dtype=int, ndmin=2).reshape((-1, 2))
+        weights = np.broadcast_to(np.array(weights, dtype=float),
+            (edges.shape[0],))
+        if np.any((edges < 0) | (edges >= n_genes)):
+            msg = f'Edges must connect genes between 0 and {n_genes - 1}.'
+            raise ValueError(msg)
+        network = cls(n_genes, sparse=sparse)
+        network.basal[:] = basal
+        inter = csr_array((weights, (edges[:, 0], edges[:, 1])),
+            shape=(n_genes, n_genes))
+        inter.sum_duplicates()
+        network.inter = inter if sparse else inter.toarray()
+        return network
+
+    @property
+    def is_sparse(self):
+        """Whether the interaction matrix is stored as a sparse array."""
+        return issparse(self.inter)
+
+    def to_sparse(self):
+        """Return a copy of the network with a sparse interaction matrix."""
+        network = Network(self.n_genes, sparse=True)
+        network.basal[:] = self.basal
+        network.inter = csr_array(self.inter)
+        network.inter.eliminate_zeros()
+        return network
+
+    def to_dense(self):
+        """Return a copy of the network with a dense interaction matrix."""
+        network = Network(self.n_genes)
+        network.basal[:] = self.basal
+        if self.is_sparse:
+            network.inter[:] = self.inter.toarray()
+        else:
+            network.inter[:] = self.inter
+        return network
+
+
+def sigmoid_rate(z, k0, k1):
+    """Burst frequency as a function of the sigmoid argument `z`."""
+    sigma = expit(z)
+    return (1-sigma)*k0 + sigma*k1
 
 
 def kon_sigmoid(x, k0, k1, basal, inter):
     """Define interactions using a logistic function (sigmoid)."""
+    return sigmoid_rate(basal + x @ inter, k0, k1)
+
+
+def kon_sigmoid_jacobian(x, k0, k1, basal, inter):
+    """Jacobian matrix of `kon_sigmoid` with entries d kon[j] / d x[i].
+
+    Rows correspond to genes j (burst frequencies) and columns to genes i
+    (protein levels), with batch dimensions of `x` in front if any. The
+    Jacobian of a single state is sparse if `inter` is sparse.
+    """
     sigma = expit(basal + x @ inter)
-    return (1-sigma)*k0 + sigma*k1
+    slope = (k1 - k0) * sigma * (1 - sigma)
+    if issparse(inter):
+        if np.ndim(x) == 1:
+            return csr_array(inter.T.multiply(slope[:, None]))
+        inter = inter.toarray()
+    return slope[..., :, None] * inter.T
+
+
+def split_interactions(inter):
+    """Split the interaction matrix into activating and repressing parts.
+
+    Sparse parts are stored transposed in CSR format, so that products
+    with states do not rebuild the matrices (see `kon_sigmoid_bound`).
+    """
+    if issparse(inter):
+        inter = csr_array(inter.T)
+        return inter.maximum(0).tocsr(), inter.minimum(0).tocsr()
+    return np.maximum(inter, 0), np.minimum(inter, 0)
+
+
+def _product(x, parts):
+    """Products `x @ inter_pos` and `x @ inter_neg` of split interactions."""
+    if issparse(parts[0]):
+        return tuple((a @ x.T).T for a in parts)
+    return x @ parts[0], x @ parts[1]
+
+
+def kon_sigmoid_bound(x, k0, k1, basal, inter, decay):
+    """Bound `kon_sigmoid` along the flow from `x` to `x*decay`.
+
+    Since every protein level decreases monotonically between jumps,
+    activating terms of `x @ inter` can only decrease and repressing terms
+    can only increase: the extreme values of the sigmoid argument are thus
+    attained by mixing the two endpoints according to the sign of `inter`.
+    The interaction matrix can also be given as the pair returned by
+    `split_interactions`, to avoid splitting it again at each call.
+    """
+    if not isinstance(inter, tuple):
+        inter = split_interactions(inter)
+    z_pos, z_neg = _product(x, inter)
+    if np.shape(decay)[-1:] in [(), (1,)]:
+        # Common decay rate: only two products are needed
+        z_max = basal + z_pos + decay * z_neg
+        z_min = basal + decay * z_pos + z_neg
+    else:
+        z_end_pos, z_end_neg = _product(x * decay, inter)
+        z_max = basal + z_pos + z_end_neg
+        z_min = basal + z_end_pos + z_neg
+    # The sigmoid is monotonic so the bound is reached at z_min or z_max
+    return np.maximum(sigmoid_rate(z_max, k0, k1), sigmoid_rate(z_min, k0, k1))
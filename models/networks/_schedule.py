@@ -0,0 +1,118 @@
+"""Time-dependent schedules of basal activities and stimulus inputs."""
+import numpy as np
+
+
+class Schedule:
+    """Store offsets added to basal activities over time.
+
+    The offsets are given at time points `times` (increasing) by `values`
+    with shape (n_times, n_genes), or (n_times,) for an offset shared by
+    all genes. They are either piecewise-constant (`kind='constant'`, each
+    value holding until the next time point) or linearly interpolated
+    (`kind='linear'`), and kept constant before the first and after the
+    last time point. Time points are the breakpoints of the schedule: the
+    offsets are linear between two of them, so that their range over any
+    interval is attained at its ends or at breakpoints.
+    """
+
+    def __init__(self, times, values, kind='constant'):
+        times = np.array(times, dtype=float, ndmin=1)
+        values = np.array(values, dtype=float)
+        if times.ndim > 1 or np.any(np.diff(times) <= 0):
+            msg = 'Schedule times must be a 1D array in increasing order.'
+            raise ValueError(msg)
+        if values.shape[:1] != times.shape or values.ndim > 2:
+            msg = (f'Schedule values must have shape ({times.size},) or '
+                f'({times.size}, n_genes).')
+            raise ValueError(msg)
+        if kind not in ['constant', 'linear']:
+            msg = "Schedule kind must be either 'constant' or 'linear'."
+            raise ValueError(msg)
+        self.times = times
+        self.values = values.reshape((times.size, -1))
+        self.kind = kind
+
+        # Precomputed arrays shared by all simulations
+        self.breakpoints = np.append(times, np.inf)
+        self.slopes = np.diff(self.values, axis=0) / np.diff(times)[:, None]
+        if kind == 'constant':
+            self.slopes[:] = 0
+
+    @classmethod
+    def stimulus(cls, times, levels, weights, kind='constant'):
+        """Schedule of a stimulus acting on genes with given `weights`.
+
+        The stimulus has the given `levels` at `times` and adds `levels *
+        weights` to basal activities, like a regulator of fixed level (e.g.
+        switching from 0 to 1 to model a stimulus applied at some time).
+        """
+        values = np.multiply.outer(np.asarray(levels, dtype=float),
+            np.asarray(weights, dtype=float))
+        return cls(times, values, kind=kind)
+
+    @classmethod
+    def from_function(cls, function, times):
+        """Linear interpolation of a smooth schedule `function(t)`.
+
+        The function returns offsets for a scalar time `t`, and is sampled
+        at `times`, which should be fine enough to capture its variations.
+        """
+        times = np.array(times, dtype=float, ndmin=1)
+        values = np.array([function(t) for t in times])
+        return cls(times, values, kind='linear')
+
+    @property
+    def n_genes(self):
+        """Number of genes (1 if the offset is shared by all genes)."""
+        return self.values.shape[1]
+
+    def segment(self, t):
+        """Index of the breakpoint that starts the segment containing `t`."""
+        return np.searchsorted(self.times, t, side='right') - 1
+
+    def next_breakpoint(self, t):
+        """Time of the first breakpoint after `t` (inf if none)."""
+        return self.breakpoints[self.segment(t) + 1]
+
+    def offset(self, t):
+        """Offsets at time(s) `t`, with shape t.shape + (n_genes,)."""
+        k = np.maximum(self.segment(t), 0)
+        if self.times.size == 1:
+            return self.values[k]
+        # Offsets are constant before the first and after the last breakpoint
+        dt = np.clip(np.subtract(t, self.times[k]), 0, None)
+        dt = np.where(k < self.times.size - 1, dt, 0)
+        k_slope = np.minimum(k, self.times.size - 2)
+        return self.values[k] + self.slopes[k_slope] * dt[..., None]
+
+    def offset_range(self, t, h):
+        """Minimum and maximum offsets over the interval [t, t+h).
+
+        For piecewise-constant offsets, the value starting at `t+h` is not
+        included, so that the range over a segment is a single value.
+        """
+        t = np.asarray(t, dtype=float)
+        end = t + h
+        low = high = self.offset(t)
+        if self.kind == 'linear':
+            b = self.offset(end)
+            low, high = np.minimum(low, b), np.maximum(high, b)
+        inside = (self.times > t[..., None]) & (self.times < end[..., None])
+        if np.any(inside):
+            inside = inside[..., None]
+            low = np.minimum(low, np.min(np.where(inside, self.values,
+                np.inf), axis=-2))
+            high = np.maximum(high, np.max(np.where(inside, self.values,
+                -np.inf), axis=-2))
+        return low, high
+
+
+# Tests
+if __name__ == '__main__':
+    # Stimulus switching on at t = 5 and acting on the first gene
+    schedule = Schedule.stimulus([0, 5], [0, 1], [10, 0])
+    print(schedule.offset([0, 4.9, 5, 100]))
+    print(schedule.next_breakpoint(2), schedule.offset_range(4, 2))
+    # Smooth schedule
+    schedule = Schedule.from_function(np.sin, np.linspace(0, 10, 101))
+    print(schedule.offset([0.05, np.pi/2]), schedule.offset_range(1, 2))
@@ -0,0 +1,82 @@
+"""Sinks for recording trajectories on disk with bounded memory.
+
+Trajectory blocks yielded by `simulate_iter` (e.g. `BurstyGRN.simulate_iter`
+or `LimitGRN.simulate_iter`) are written directly into a memory-mapped file,
+so that peak memory does not depend on the number of time points.
+"""
+import numpy as np
+
+
+class MemmapSink:
+    """Write trajectory blocks into a raw binary file (`np.memmap`).
+
+    The file contains the protein levels as a C-ordered array of shape
+    (n_times, n_genes) without header: it can be read back using
+    `np.memmap(path, dtype, mode='r', shape=(n_times, n_genes))`.
+    """
+
+    def __init__(self, path, n_times, n_genes, dtype=float):
+        self.path = path
+        self.shape = (n_times, n_genes)
+        self.position = 0  # Number of time points already written
+        self.data = self._open(path, self.shape, np.dtype(dtype))
+
+    def _open(self, path, shape, dtype):
+        """Create the memory-mapped array."""
+        return np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+
+    def write(self, t, x):
+        """Write a block of protein levels `x` at time points `t`."""
+        x = np.reshape(x, (np.size(t), -1))
+        start, stop = self.position, self.position + x.shape[0]
+        if stop > self.shape[0]:
+            msg = f'Sink is full ({self.shape[0]} time points).'
+            raise ValueError(msg)
+        self.data[start:stop] = x
+        self.position = stop
+
+    def write_all(self, blocks):
+        """Write all blocks given by an iterator of pairs (t, x)."""
+        for t, x in blocks:
+            self.write(t, x)
+        return self
+
+    def close(self):
+        """Flush data to disk and release the memory map."""
+        if self.data is not None:
+            self.data.flush()
+            self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class NpySink(MemmapSink):
+    """Write trajectory blocks into a `.npy` file.
+
+    The file can be read back using `np.load(path, mmap_mode='r')`.
+    """
+
+    def _open(self, path, shape, dtype):
+        """Create the memory-mapped array with a `.npy` header."""
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+            shape=shape)
+
+
+# Tests
+if __name__ == '__main__':
+    import os
+    import tempfile
+    from models_solution import BurstyGRN
+    from models.networks import toggle_switch
+    model = BurstyGRN(toggle_switch)
+    time = np.linspace(0, 100, 10001)
+    sim = model.simulate(time, seed=0)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'traj.npy')
+        with NpySink(path, time.size, model.n_genes) as sink:
+            sink.write_all(model.simulate_iter(time, seed=0, chunk=500))
+        print(np.array_equal(np.load(path, mmap_mode='r'), sim.x))
@@ -0,0 +1,135 @@
+"""Statistics and profiling of simulation runs.
+
+A `SimulationStats` object is attached to trajectories as `meta['stats']`.
+When profiling is enabled, the simulation loop runs on a copy of the model
+whose methods that evaluate burst frequencies, rate bounds and the flow
+are timed, so that the loops do not need to be modified and are not slowed
+down when profiling is off. The model itself is never modified.
+"""
+import copy
+import time as clock
+import numpy as np
+
+# Model methods timed in each section (if they exist)
+SECTIONS = {
+    'kon': ['kon', 'kon_field', 'kon_gene'],
+    'bound': ['kon_bound'],
+    'flow': ['flow'],
+}
+
+
+class SimulationStats:
+    """Store jump counts, function calls and timing of a simulation.
+
+    Attributes:
+
+    - `n_steps`, `n_real` and `n_phantom`: number of steps, real jumps and
+      phantom jumps (including local bounds that expired without any jump);
+    - `time['total']`: wall time (seconds) of the simulation loop.
+
+    When profiling, the following attributes are also set:
+
+    - `real` and `phantom`: number of real and phantom jumps per gene
+      (phantom jumps of the global bound are attributed to genes according
+      to their share of the rejected rate, hence non-integer values);
+    - `expired`: number of local bounds that expired without any jump;
+    - `kon_calls`: number of evaluations of burst frequencies;
+    - `time`: wall time of each section of the simulation loop, `sampling`
+      being the remaining time spent in random steps.
+    """
+
+    def __init__(self, n_genes, profile=False):
+        self.n_genes = n_genes
+        self.profile = profile  # Whether per-gene counts and time are set
+        self.n_steps = 0
+        self.n_real = 0
+        self.n_phantom = 0
+        self.real = np.zeros(n_genes, dtype=int) if profile else None
+        self.phantom = np.zeros(n_genes) if profile else None
+        self.expired = 0
+        self.kon_calls = 0
+        self.time = dict.fromkeys(['total', 'kon', 'bound', 'flow',
+            'sampling', 'recording'], 0.0)
+        self.last = {}  # Last call of each instrumented method
+
+    @property
+    def efficiency(self):
+        """Fraction of steps of the thinning method that are real jumps."""
+        return self.n_real / max(self.n_steps, 1)
+
+    def set_jumps(self, n_jumps):
+        """Set total jump counts (phantom and real)."""
+        self.n_phantom, self.n_real = int(n_jumps[0]), int(n_jumps[1])
+        self.n_steps = self.n_phantom + self.n_real
+
+    def finish(self, total):
+        """Set the total time and deduce the sampling time."""
+        self.time['total'] = total
+        if self.profile:
+            other = sum(v for k, v in self.time.items()
+                if k not in ['total', 'sampling'])
+            self.time['sampling'] = max(total - other, 0.0)
+        self.last = {}
+
+    def summary(self):
+        """Describe the statistics in a few lines."""
+        if self.n_real + self.n_phantom > 0:
+            lines = [f'{self.n_steps} steps: {self.n_real} real jumps, '
+                f'{self.n_phantom} phantom jumps (efficiency '
+                f'{100*self.efficiency:.1f}%) in {self.time["total"]:.4f}s']
+        else:
+            lines = [f'{self.n_steps} steps in {self.time["total"]:.4f}s']
+        if self.profile:
+            total = max(self.time['total'], 1e-12)
+            parts = ', '.join(f'{k} {100*v/total:.1f}%'
+                for k, v in self.time.items() if k != 'total')
+            lines.append(f'Time: {parts}, {self.kon_calls} kon calls')
+        if self.profile and np.sum(self.phantom) > 0:
+            worst = np.argsort(self.phantom)[::-1][:5]
+            lines.append('Most phantom jumps: ' + ', '.join(
+                f'gene {i} ({self.phantom[i]:.0f})' for i in worst))
+        return '\n'.join(lines)
+
+    def as_dict(self):
+        """Convert to a dictionary (e.g. for saving as metadata)."""
+        stats = {'n_steps': self.n_steps, 'n_real': self.n_real,
+            'n_phantom': self.n_phantom, 'efficiency': self.efficiency,
+            'time': dict(self.time)}
+        if self.profile:
+            stats.update({'real': self.real, 'phantom': self.phantom,
+                'expired': self.expired, 'kon_calls': self.kon_calls})
+        return stats
+
+    def __repr__(self):
+        return f'SimulationStats({self.summary()})'
+
+
+def instrument(model, stats: SimulationStats):
+    """Copy of `model` whose methods listed in `SECTIONS` are timed.
+
+    The copy is shallow (parameters are shared) and only the methods of the
+    copy are replaced, so that the model can still be used elsewhere, e.g.
+    by other threads. The last positional arguments and result of each
+    method are stored in `stats.last` so that simulation loops can
+    attribute phantom jumps.
+    """
+    model = copy.copy(model)
+    for section, methods in SECTIONS.items():
+        for name in methods:
+            if hasattr(model, name):
+                setattr(model, name, _timed(getattr(model, name), name,
+                    section, stats))
+    return model
+
+
+def _timed(f, name, section, stats):
+    """Timed version of `f`."""
+    def g(*args, **kwargs):
+        tic = clock.perf_counter()
+        result = f(*args, **kwargs)
+        stats.time[section] += clock.perf_counter() - tic
+        if section == 'kon':
+            stats.kon_calls += 1
+        stats.last[name] = (args, result)
+        return result
+    return g
@@ -0,0 +1,241 @@
+"""Containers for simulated gene expression trajectories.
+
+Trajectories can be saved in an uncompressed binary format made of a magic
+string, a JSON header and raw arrays aligned on 64 bytes, so that they can
+be loaded lazily as memory maps. Metadata (model parameters, seed, jump
+counts, etc.) is stored in the header, except arrays that are stored in
+the same way as the trajectory.
+"""
+import json
+import numpy as np
+from scipy.sparse import csr_array, issparse
+
+# File format
+MAGIC = b'CSBTRAJ\x01'
+ALIGN = 64
+
+
+class Trajectory:
+    """Store single-cell gene expression trajectories.
+
+    The array `x` of protein levels has shape (n_times, n_genes), or
+    (n_times,) for single-gene models. Selecting time points or genes
+    using slices gives views of the same data (no copy).
+    """
+
+    __slots__ = ('t', 'x', 'meta')
+
+    _cell_axes = 0  # Number of leading axes for cells
+
+    def __init__(self, t, x, meta=None, dtype=None):
+        self.t = t  # Time points
+        self.x = x if dtype is None else np.asarray(x, dtype=dtype)
+        self.meta = {} if meta is None else meta  # Metadata
+
+    def __repr__(self):
+        name = type(self).__name__
+        return f'{name}(shape={self.x.shape}, dtype={self.x.dtype})'
+
+    @property
+    def n_times(self):
+        """Number of time points."""
+        return self.t.size
+
+    @property
+    def n_genes(self):
+        """Number of genes."""
+        return self.x.shape[-1] if self.x.ndim > self._cell_axes + 1 else 1
+
+    @property
+    def nbytes(self):
+        """Memory used by the trajectory array."""
+        return self.x.nbytes
+
+    def _new(self, t, x):
+        return type(self)(t, x, meta=self.meta)
+
+    def select(self, time=slice(None), genes=slice(None)):
+        """Select time points and/or genes (views when using slices)."""
+        x = self.x[(slice(None),) * self._cell_axes + (time,)]
+        if self.x.ndim > self._cell_axes + 1:
+            x = x[..., genes]
+        elif not (isinstance(genes, slice) and genes == slice(None)):
+            msg = 'Cannot select genes of a single-gene trajectory.'
+            raise ValueError(msg)
+        return self._new(self.t[time], x)
+
+    def gene(self, i):
+        """Trajectory of gene `i` (view)."""
+        return self.select(genes=i)
+
+    def astype(self, dtype):
+        """Return a copy with protein levels stored as `dtype`."""
+        return self._new(self.t, self.x.astype(dtype))
+
+    def save(self, path):
+        """Save to a binary file that can be loaded as a memory map."""
+        arrays = {'t': np.asarray(self.t), 'x': np.asarray(self.x)}
+        meta = _encode(self.meta, arrays, 'meta')
+        # Header with array layout (offsets relative to the data section)
+        layout, offset = {}, 0
+        for name, a in arrays.items():
+            offset = -(-offset // ALIGN) * ALIGN
+            layout[name] = {'dtype': a.dtype.str, 'shape': a.shape,
+                'offset': offset}
+            offset += a.nbytes
+        header = json.dumps({'type': type(self).__name__, 'arrays': layout,
+            'meta': meta}).encode()
+        start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            for name, a in arrays.items():
+                f.seek(start + layout[name]['offset'])
+                f.write(np.ascontiguousarray(a).tobytes())
+            f.truncate(start + offset)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a trajectory saved by `save`.
+
+        By default, arrays are memory-mapped (read-only) so that only the
+        parts which are actually used are read from disk. Use `mmap_mode`
+        = None to load everything in memory.
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                msg = f'{path} is not a trajectory file.'
+                raise ValueError(msg)
+            size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(size))
+        start = -(-(len(MAGIC) + 8 + size) // ALIGN) * ALIGN
+        arrays = {}
+        for name, info in header['arrays'].items():
+            dtype, shape = np.dtype(info['dtype']), tuple(info['shape'])
+            offset = start + info['offset']
+            if mmap_mode is None or 0 in shape:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    count = int(np.prod(shape))
+                    a = np.fromfile(f, dtype=dtype, count=count)
+                arrays[name] = a.reshape(shape)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode=mmap_mode,
+                    offset=offset, shape=shape)
+        types = {'Trajectory': Trajectory, 'TrajectoryBatch': TrajectoryBatch}
+        if header['type'] not in types:
+            msg = f'Unknown trajectory type {header["type"]!r}.'
+            raise ValueError(msg)
+        meta = _decode(header['meta'], arrays)
+        return types[header['type']](arrays['t'], arrays['x'], meta=meta)
+
+
+class TrajectoryBatch(Trajectory):
+    """Store trajectories of a batch of cells sharing the same time points.
+
+    The array `x` has shape (n_cells, n_times, n_genes), or (n_cells,
+    n_times) for single-gene models. Indexing by cell returns a view of a
+    single trajectory, and slicing returns a view of a smaller batch.
+    """
+
+    __slots__ = ()
+
+    _cell_axes = 1
+
+    def __len__(self):
+        return self.x.shape[0]
+
+    @property
+    def n_cells(self):
+        """Number of cells."""
+        return self.x.shape[0]
+
+    def __getitem__(self, cells):
+        if isinstance(cells, (int, np.integer)):
+            return Trajectory(self.t, self.x[cells], meta=self.meta)
+        return self._new(self.t, self.x[cells])
+
+    def __iter__(self):
+        for i in range(self.n_cells):
+            yield self[i]
+
+    def snapshot(self, k):
+        """Protein levels of all cells at the time point of index `k`."""
+        return self.x[:, k]
+
+
+def _encode(value, arrays, name):
+    """Convert metadata to JSON, moving arrays to `arrays`."""
+    if issparse(value):
+        value = value.tocsr()
+        return {'__sparse__': _encode({'data': value.data,
+            'indices': value.indices, 'indptr': value.indptr,
+            'shape': list(value.shape)}, arrays, name)}
+    if isinstance(value, np.ndarray):
+        arrays[name] = value
+        return {'__array__': name}
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'as_dict'):
+        return _encode(value.as_dict(), arrays, name)
+    if isinstance(value, dict):
+        return {str(k): _encode(v, arrays, f'{name}/{k}')
+            for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v, arrays, f'{name}/{i}') for i, v in enumerate(value)]
+    return value
+
+
+def _decode(value, arrays):
+    """Rebuild metadata encoded by `_encode`."""
+    if isinstance(value, dict):
+        if '__array__' in value:
+            return arrays[value['__array__']]
+        if '__sparse__' in value:
+            d = _decode(value['__sparse__'], arrays)
+            return csr_array((d['data'], d['indices'], d['indptr']),
+                shape=tuple(d['shape']))
+        return {k: _decode(v, arrays) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v, arrays) for v in value]
+    return value
+
+
+def model_meta(model, **info):
+    """Describe a model and a simulation as trajectory metadata.
+
+    Parameters are the model attributes, where a network is replaced by
+    its `basal` and `inter` arrays. Additional information such as the seed
+    or jump counts is given by keyword arguments.
+    """
+    params = {}
+    for name, value in vars(model).items():
+        if hasattr(value, 'basal') and hasattr(value, 'inter'):
+            params['basal'] = value.basal
+            params['inter'] = value.inter
+        elif isinstance(value, (int, float, np.ndarray, np.generic)):
+            params[name] = value
+    seed = info.get('seed')
+    if seed is not None and not isinstance(seed, (int, np.integer)):
+        info['seed'] = None  # Only integer seeds are recorded
+    return {'model': type(model).__name__, 'params': params, **info}
+
+
+# Tests
+if __name__ == '__main__':
+    import os
+    import tempfile
+    t = np.linspace(0, 10, 11)
+    x = np.random.default_rng(0).random((100, t.size, 3))
+    batch = TrajectoryBatch(t, x, meta={'seed': 0, 'n_jumps': np.arange(2)},
+        dtype=np.float32)
+    print(batch, batch[0], batch[10:20].select(time=slice(5), genes=1))
+    print(np.shares_memory(batch.x, batch[5].select(genes=slice(1)).x))
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'batch.traj')
+        batch.save(path)
+        batch2 = Trajectory.load(path)
+        print(batch2, type(batch2.x).__name__, batch2.meta)
+        print(np.array_equal(batch.x, batch2.x))
+        del batch2
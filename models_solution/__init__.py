@@ -7,6 +7,8 @@ single-cell level.
 """
 from models_solution.bursty_base import BurstyBase
 from models_solution.bursty_grn import BurstyGRN
+from models_solution.hybrid_grn import HybridGRN
 from models_solution.limit_grn import LimitGRN
+from models_solution.events import EventLog
 
-__all__ = ['BurstyBase', 'BurstyGRN', 'LimitGRN']
+__all__ = ['BurstyBase', 'BurstyGRN', 'EventLog', 'HybridGRN', 'LimitGRN']
@@ -1,14 +1,10 @@
 """Simulation of the Bursty model for a single gene with no feedback."""
 import numpy as np
+from scipy.stats import gamma
 import models._utils as utils
-
-
-class Trajectory:
-    """Store single-cell gene expression trajectories."""
-
-    def __init__(self, t, x):
-        self.t = t  # Time points
-        self.x = x  # Protein levels
+from models.trajectory import Trajectory, TrajectoryBatch, model_meta
+import models_solution._compiled as compiled
+from models_solution.events import EventLog, embedded_chain
 
 
 class BurstyBase:
@@ -24,8 +20,16 @@ class BurstyBase:
         self.burst_frequency = burst_frequency
         self.degradation_rate = degradation_rate
 
-    def simulate(self, time, init_state=0.0, seed=None, verb=False):
-        """Perform exact simulation (extracted at given time points)."""
+    def simulate(self, time, init_state=0.0, seed=None, verb=False,
+        backend='numpy', record='states'):
+        """Perform exact simulation (extracted at given time points).
+
+        The `numba` backend runs the simulation in compiled code, and falls
+        back to NumPy if Numba is not installed.
+
+        If `record` is `events`, return instead the `EventLog` of all bursts
+        up to `time[-1]`, which can rebuild the trajectory at any time points.
+        """
         burst_size = self.burst_size
         burst_frequency = self.burst_frequency
         degradation_rate = self.degradation_rate
@@ -34,34 +38,131 @@ class BurstyBase:
         time = utils.check_time_points(time).reshape((-1,))
         init_state = utils.check_init_state(init_state, shape=())
 
+        if record not in ['states', 'events']:
+            msg = "Record must be either 'states' or 'events'."
+            raise ValueError(msg)
+
         # Define a random generator
         rng = np.random.default_rng(seed)
 
+        # Compiled version
+        if compiled.check_backend(backend) == 'numba':
+            if record == 'events':
+                msg = 'Numba backend does not support recording events.'
+                raise ValueError(msg)
+            traj, n = compiled.bursty_base_exact(time, float(init_state),
+                burst_size, burst_frequency, degradation_rate,
+                compiled.kernel_seed(rng))
+            if verb:
+                print(f'Simulation generated {n} jumps.')
+            meta = model_meta(self, seed=seed, n_jumps=int(n))
+            return Trajectory(time, traj, meta=meta)
+
         # Sample total number of bursts
         n = rng.poisson(burst_frequency * time[-1])
 
-        # Sample burst times and heights
-        t = rng.uniform(low=0, high=time[-1], size=n)
+        # Sample sorted burst times (from normalized exponential spacings)
+        # and burst heights
+        s = np.cumsum(rng.standard_exponential(n + 1))
+        t = time[-1] * s[:-1] / s[-1]
         h = rng.exponential(scale=burst_size, size=n)
 
+        # Optional: return the event log
+        if record == 'events':
+            events = EventLog(init_state, degradation_rate, t_end=time[-1],
+                capacity=n)
+            events.extend(t, np.zeros(n, dtype=int), h)
+            if verb:
+                print(f'Simulation generated {n} jumps.')
+            return events
+
         # Build the post-jump embedded Markov chain
-        t = np.append(0, np.sort(t))
-        x = np.zeros(n + 1)
-        x[0] = init_state
-        for k in range(n):
-            dt = t[k+1] - t[k]
-            x[k+1] = x[k] * np.exp(- degradation_rate * dt) + h[k]
+        t = np.append(0, t)
+        x = embedded_chain(t, np.append(init_state, h), degradation_rate)
 
         # Extract states at user time points
-        traj = np.zeros(time.size)
-        for i, u in enumerate(time):
-            k = np.argwhere(t <= u)[-1][0]
-            dt = u - t[k]
-            traj[i] = x[k] * np.exp(- degradation_rate * dt)
+        k = np.searchsorted(t, time, side='right') - 1
+        traj = x[k] * np.exp(- degradation_rate * (time - t[k]))
         if verb:
             print(f'Simulation generated {n} jumps.')
 
-        return Trajectory(time, traj)
+        meta = model_meta(self, seed=seed, n_jumps=int(n))
+        return Trajectory(time, traj, meta=meta)
+
+    def simulate_population(self, time, n_cells, init_state=0.0, seed=None,
+        verb=False):
+        """Perform exact simulation of independent cells in parallel.
+
+        Burst times of all cells are stored in a single array padded with
+        zero-height bursts at the final time point. The trajectory array `x`
+        has shape (n_cells, n_times).
+        """
+        burst_size = self.burst_size
+        burst_frequency = self.burst_frequency
+        degradation_rate = self.degradation_rate
+
+        # Check simulation parameters
+        time = utils.check_time_points(time).reshape((-1,))
+        init_state = utils.check_init_state(init_state)
+        if np.shape(init_state) not in [(), (n_cells,)]:
+            msg = f'Initial state must be a scalar value or have shape ' \
+                f'({n_cells},).'
+            raise ValueError(msg)
+
+        # Define a random generator
+        rng = np.random.default_rng(seed)
+
+        # Sample total number of bursts for each cell
+        n = rng.poisson(burst_frequency * time[-1], size=n_cells)
+        m = np.max(n, initial=0)
+
+        # Sample sorted burst times (padding times are equal to time[-1])
+        s = rng.standard_exponential((n_cells, m + 1))
+        s[np.arange(m + 1) > n[:, None]] = 0
+        s = np.cumsum(s, axis=1)
+        t = time[-1] * s[:, :-1] / s[np.arange(n_cells), n][:, None]
+
+        # Sample burst heights (padding heights are equal to zero)
+        h = rng.exponential(scale=burst_size, size=(n_cells, m))
+        h[np.arange(m) >= n[:, None]] = 0
+
+        # Build the post-jump embedded Markov chains
+        t = np.hstack([np.zeros((n_cells, 1)), t])
+        h = np.hstack([np.zeros((n_cells, 1)) + init_state[..., None], h])
+        x = embedded_chain(t, h, degradation_rate)
+
+        # Extract states at user time points: the index of the last burst
+        # before each time point is obtained by a stable merge of burst
+        # times and time points for each cell
+        z = np.hstack([t, np.broadcast_to(time, (n_cells, time.size))])
+        order = np.argsort(z, axis=1, kind='stable')
+        count = np.cumsum(order <= m, axis=1)
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(z.shape[1]), axis=1)
+        k = np.take_along_axis(count, rank[:, m+1:], axis=1) - 1
+        t, x = np.take_along_axis(t, k, 1), np.take_along_axis(x, k, 1)
+        traj = x * np.exp(- degradation_rate * (time - t))
+        if verb:
+            print(f'Simulation generated {np.sum(n)} jumps.')
+
+        meta = model_meta(self, seed=seed, n_jumps=n)
+        return TrajectoryBatch(time, traj, meta=meta)
+
+    def sample_stationary(self, n_samples, seed=None):
+        """Sample protein levels from the stationary distribution.
+
+        The stationary distribution is known explicitly: it is the Gamma
+        distribution with shape k/d and scale b, where k is the burst
+        frequency, d the degradation rate and b the burst size.
+        """
+        shape = self.burst_frequency / self.degradation_rate
+        rng = np.random.default_rng(seed)
+        return rng.gamma(shape, scale=self.burst_size, size=n_samples)
+
+    def stationary_density(self, x):
+        """Density of the stationary distribution at protein levels `x`."""
+        shape = self.burst_frequency / self.degradation_rate
+        return gamma.pdf(x, shape, scale=self.burst_size)
 
 
 # Tests
@@ -72,3 +173,12 @@ if __name__ == '__main__':
     sim = model.simulate(time, verb=True)
     print(sim.t)
     print(sim.x)
+    # Simulation of a population of cells
+    sim = model.simulate_population(time, n_cells=1000, verb=True)
+    print(sim.x.mean(axis=0))
+    # Event log evaluated at given time points
+    events = model.simulate(time, seed=0, record='events')
+    sim = model.simulate(time, seed=0)
+    print(np.max(np.abs(events.evaluate(time) - sim.x)))
+    # Stationary distribution
+    print(model.sample_stationary(1000, seed=0).mean())
@@ -1,25 +1,50 @@
 """Simulation of the Bursty model for a gene regulatory network."""
+import time as clock
+import warnings
+from contextlib import contextmanager
 import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.sparse import (
+    csc_array,
+    csr_array,
+    diags_array,
+    eye_array,
+    issparse,
+    kron,
+)
+from scipy.sparse.linalg import LinearOperator, gmres, splu
 import models._utils as utils
-from models.networks import Network, kon_sigmoid
-
-
-class Trajectory:
-    """Store single-cell gene expression trajectories."""
-
-    def __init__(self, t, x):
-        self.t = t  # Time points
-        self.x = x  # Protein levels
+from models.trajectory import Trajectory, TrajectoryBatch, model_meta
+import models_solution._compiled as compiled
+import models_solution._next_reaction as next_reaction
+from models_solution.events import EventLog
+from models.diagnostics import effective_sample_size, split_rhat
+from models.stats import SimulationStats, instrument
+from models.networks import (
+    Network,
+    Schedule,
+    kon_sigmoid,
+    kon_sigmoid_bound,
+    kon_sigmoid_jacobian,
+    sigmoid_rate,
+    split_interactions,
+)
 
 
 class BurstyGRN:
-    """Bursty model for a GRN with any number of interacting genes."""
+    """Bursty model for a GRN with any number of interacting genes.
+
+    An optional `schedule` (see `models.networks.Schedule`) adds
+    time-dependent offsets to basal activities, e.g. a stimulus. It is
+    supported by the thinning method and `simulate_population`.
+    """
 
     def __init__(self, network: Network,
         burst_size=1.0,
         burst_frequency_min=0.0,
         burst_frequency_max=2.0,
-        degradation_rate=1.0):
+        degradation_rate=1.0,
+        schedule: Schedule = None):
 
         # Set model parameters
         self.network = network
@@ -27,21 +52,94 @@ class BurstyGRN:
         self.burst_frequency_min = burst_frequency_min
         self.burst_frequency_max = burst_frequency_max
         self.degradation_rate = degradation_rate
+        self.schedule = schedule
 
         # Store the number of genes
         self.n_genes = network.basal.size
 
-    def kon(self, x):
-        """Define burst frequencies as a function of protein levels."""
+        # Interactions split by sign and sparse columns (set during runs)
+        self._inter_split = None
+        self._inter_columns = None
+
+    def basal_at(self, t=None):
+        """Basal activities at time(s) `t` (including the schedule)."""
+        if t is None or self.schedule is None:
+            return self.network.basal
+        return self.network.basal + self.schedule.offset(t)
+
+    def kon(self, x, t=None):
+        """Define burst frequencies as a function of protein levels.
+
+        With a schedule, `t` is the current time (one per state if `x` is a
+        batch of states).
+        """
         k0 = self.burst_frequency_min
         k1 = self.burst_frequency_max
-        basal = self.network.basal
+        basal = self.basal_at(t)
         inter = self.network.inter
         return kon_sigmoid(x, k0, k1, basal, inter)
 
-    def rate_bound(self):
-        """Compute the global burst rate upper bound."""
-        return self.n_genes * self.burst_frequency_max
+    def kon_field(self, h):
+        """Burst frequencies given the field `h = x @ inter`."""
+        k0 = self.burst_frequency_min
+        k1 = self.burst_frequency_max
+        return sigmoid_rate(self.network.basal + h, k0, k1)
+
+    def kon_gene(self, x, i, t=None):
+        """Burst frequency of gene `i` only."""
+        k0 = np.broadcast_to(self.burst_frequency_min, (self.n_genes,))[i]
+        k1 = np.broadcast_to(self.burst_frequency_max, (self.n_genes,))[i]
+        basal = np.broadcast_to(self.basal_at(t), (self.n_genes,))[i]
+        columns = self._inter_columns
+        if columns is not None:
+            a, b = columns.indptr[i], columns.indptr[i+1]
+            z = basal + x[columns.indices[a:b]] @ columns.data[a:b]
+            return sigmoid_rate(z, k0, k1)
+        inter = self.network.inter[:, [i]]
+        return kon_sigmoid(x, k0, k1, basal, inter)[0]
+
+    def kon_bound(self, x, horizon, t=None):
+        """Bound burst frequencies along the flow from `x` during `horizon`.
+
+        With a schedule, the bound holds over [t, t+horizon] for the range
+        of basal activities on this interval. Batches of states may be given
+        with one horizon and time per state.
+        """
+        k0 = self.burst_frequency_min
+        k1 = self.burst_frequency_max
+        basal = self.network.basal
+        inter = self._inter_split
+        if inter is None:
+            inter = split_interactions(self.network.inter)
+        decay = np.exp(- self.degradation_rate
+            * np.asarray(horizon)[..., None])
+        if t is None or self.schedule is None:
+            return kon_sigmoid_bound(x, k0, k1, basal, inter, decay)
+        low, high = self.schedule.offset_range(t, horizon)
+        if np.array_equal(low, high):
+            return kon_sigmoid_bound(x, k0, k1, basal + low, inter, decay)
+        return np.maximum(
+            kon_sigmoid_bound(x, k0, k1, basal + low, inter, decay),
+            kon_sigmoid_bound(x, k0, k1, basal + high, inter, decay))
+
+    def rate_bound(self, x=None, horizon=np.inf):
+        """Compute the burst rate upper bound.
+
+        If `x` is None, return the global bound. Otherwise, return a local
+        bound that remains valid along the flow from `x` during `horizon`.
+        """
+        if x is None:
+            k1 = self.burst_frequency_max
+            return np.sum(np.broadcast_to(k1, (self.n_genes,)))
+        return np.sum(self.kon_bound(x, horizon), axis=-1)
+
+    def gene_burst_size(self, i):
+        """Mean burst size of gene(s) `i`."""
+        return np.broadcast_to(self.burst_size, (self.n_genes,))[i]
+
+    def default_horizon(self):
+        """Default validity horizon of local rate bounds."""
+        return 1 / np.max(self.degradation_rate)
 
     def flow(self, time, x):
         """Define the deterministic flow between jumps."""
@@ -73,59 +171,937 @@ class BurstyGRN:
 
         # Perform the jump
         if is_jump:
-            x[i-1] += rng.exponential(self.burst_size)
+            x[i-1] += rng.exponential(self.gene_burst_size(i-1))
+
+        return u, x, is_jump
+
+    def random_step_field(self, x, h, rng: np.random.Generator, inter):
+        """Compute next jump while maintaining the field `h = x @ inter`.
+
+        Between jumps the field decays like `x`, and a burst of gene i only
+        changes the field of its targets (row i of `inter`, in CSR format).
+        This avoids the full `x @ inter` product, which dominates the cost
+        of `random_step` for large sparse networks.
+        """
+        tau = self.rate_bound()
+
+        # Sample waiting time before next jump
+        u = rng.exponential(scale=1/tau)
+
+        # Update state and field just before jump
+        x = self.flow(u, x)
+        h = self.flow(u, h)
+
+        # Construct the vector of jump probabilities
+        v = np.zeros(self.n_genes + 1)
+        v[1:] = self.kon_field(h)/tau
+        v[0] = 1 - np.sum(v[1:])
+
+        # Sample from this distribution
+        i = np.searchsorted(np.cumsum(v), rng.random(), side='right')
+
+        # Test if jump is real (i > 0) or phantom (i = 0)
+        is_jump = i > 0
+
+        # Perform the jump and update the field of target genes
+        if is_jump:
+            s = rng.exponential(self.gene_burst_size(i-1))
+            x[i-1] += s
+            a, b = inter.indptr[i-1], inter.indptr[i]
+            h[inter.indices[a:b]] += s * inter.data[a:b]
+
+        return u, x, h, is_jump
+
+    def random_step_local(self, x, rng: np.random.Generator, horizon=None):
+        """Compute next jump using a local rate bound.
+
+        The bound is computed from the current state and is only valid during
+        `horizon`: if no jump is proposed before, the state just follows the
+        flow until `horizon` and the step is counted as a phantom jump.
+        """
+        if horizon is None:
+            horizon = self.default_horizon()
+        b = self.kon_bound(x, horizon)
+        c = np.cumsum(b)
+        tau = c[-1]
+
+        # Sample waiting time before next jump
+        u = rng.exponential(scale=1/tau) if tau > 0 else np.inf
+        if u > horizon:
+            return horizon, self.flow(horizon, x), False
+
+        # Update state just before jump
+        x = self.flow(u, x)
+
+        # Sample the gene i whose bound contains r, then accept the jump
+        # if r falls within the part of the bound covered by kon(x)[i]
+        r = tau * rng.random()
+        i = min(np.searchsorted(c, r, side='right'), self.n_genes - 1)
+        is_jump = r - (c[i] - b[i]) < self.kon_gene(x, i)
+
+        # Perform the jump
+        if is_jump:
+            x[i] += rng.exponential(self.gene_burst_size(i))
+
+        return u, x, is_jump
+
+    def random_step_schedule(self, x, rng: np.random.Generator, t,
+        horizon=np.inf):
+        """Compute next jump from time `t` with a time-dependent schedule.
+
+        With a finite `horizon`, local bounds are computed over the segment
+        of the schedule containing `t`, up to `horizon`: breakpoints are
+        deterministic events where the state just follows the flow and the
+        bound is recomputed, which is counted as a phantom jump. Otherwise
+        the global bound is used, which does not depend on the schedule.
+        """
+        if np.isinf(horizon):
+            h = np.inf
+            b = np.broadcast_to(self.burst_frequency_max, (self.n_genes,))
+        else:
+            h = min(horizon, self.schedule.next_breakpoint(t) - t)
+            b = self.kon_bound(x, h, t)
+        c = np.cumsum(b)
+        tau = c[-1]
+
+        # Sample waiting time before next jump
+        u = rng.exponential(scale=1/tau) if tau > 0 else np.inf
+        if u > h:
+            return h, self.flow(h, x), False
+
+        # Update state just before jump
+        x = self.flow(u, x)
+
+        # Sample the gene i whose bound contains r, then accept the jump
+        # if r falls within the part of the bound covered by kon(x)[i]
+        r = tau * rng.random()
+        i = min(np.searchsorted(c, r, side='right'), self.n_genes - 1)
+        is_jump = r - (c[i] - b[i]) < self.kon_gene(x, i, t + u)
+
+        # Perform the jump
+        if is_jump:
+            x[i] += rng.exponential(self.gene_burst_size(i))
 
         return u, x, is_jump
 
-    def simulate(self, time, init_state=None, seed=None, verb=False):
-        """Perform exact simulation (extracted at given time points)."""
+    def leap_size(self, x, kon, epsilon=0.03):
+        """Step size of tau-leaping with relative error `epsilon`.
+
+        The mean and variance of the change of each gene during the step are
+        bounded so that burst frequencies remain nearly constant (Cao et al.,
+        J. Chem. Phys. 2006), with a minimal change of one burst size.
+        """
+        b = self.burst_size
+        d = self.degradation_rate
+        g = np.maximum(epsilon * x, b)
+        mean = np.abs(b * kon - d * x)
+        var = 2 * b**2 * kon
+        with np.errstate(divide='ignore'):
+            return np.min(np.minimum(g / mean, g**2 / var))
+
+    def mean_leap(self, x, kon, h):
+        """Mean state after time `h` with constant burst frequencies."""
+        d = self.degradation_rate
+        b = self.burst_size
+        return x * np.exp(- d * h) - b * kon * np.expm1(- d * h) / d
+
+    def random_leap(self, x, kon, h, rng: np.random.Generator):
+        """Perform a tau-leaping step of size `h` from state `x`.
+
+        Each gene receives a Poisson number of bursts with constant frequency
+        `kon` during the step. Their total size is Gamma distributed and,
+        burst times being uniform, their mean decay over the step is applied
+        on top of the exact decay of `x`. Return the state and burst counts.
+        """
+        d = np.broadcast_to(self.degradation_rate, (self.n_genes,))
+        n = rng.poisson(kon * h)
+        s = rng.gamma(n, self.burst_size)
+        decay = np.exp(- d * h)
+        return x * decay + s * (-np.expm1(- d * h)) / (d * h), n
+
+    def midpoint_leap_size(self, x, kon, h, epsilon=0.03):
+        """Reduce the step size `h` until burst frequencies are accurate.
+
+        Frequencies are evaluated at the mean state after `h/2`, and the step
+        is accepted if using them instead of `kon` changes the mean increment
+        of each gene by less than the tolerance of `leap_size`. Return the
+        step size and midpoint frequencies.
+        """
+        g = np.maximum(epsilon * x, self.burst_size)
+        while True:
+            kon_mid = self.kon(self.mean_leap(x, kon, h/2))
+            err = np.max(self.burst_size * np.abs(kon_mid - kon) * h / g)
+            if err <= 1:
+                return h, kon_mid
+            h *= max(0.9 / np.sqrt(err), 0.1)
+
+    def simulate(self, time, init_state=None, seed=None, verb=False,
+        method='thinning', bound='global', backend='numpy', record='states',
+        profile=False, callback=None, epsilon=0.03):
+        """Perform exact simulation (extracted at given time points).
+
+        The `thinning` method uses either the `global` rate bound or `local`
+        bounds computed from the current state, which are much tighter when
+        most genes are repressed. The `next_reaction` method is an exact
+        alternative without phantom jumps: it samples real bursts directly
+        and only updates the genes regulated by the bursting gene, but each
+        update inverts integrated burst frequencies numerically, so it is
+        usually slower than thinning. With a sparse network, the global
+        bound thinning maintains the sigmoid argument incrementally instead
+        of recomputing `x @ inter` at each jump.
+
+        The `numba` backend runs the whole thinning loop (global bound) in
+        compiled code, and falls back to NumPy if Numba is not installed.
+
+        The approximate `tau_leap` method groups bursts over adaptive steps
+        with relative tolerance `epsilon` (see `leap_size`), using midpoint
+        burst frequencies, so that its cost does not depend on burst
+        frequencies. It bridges the exact model and its deterministic limit
+        (`LimitGRN`). When few bursts are expected in a step, it switches to
+        exact thinning steps (see `bound`).
+
+        If `record` is `events`, return instead the `EventLog` of all bursts
+        up to `time[-1]`, which can rebuild the trajectory at any time points.
+
+        If the model has a schedule, only the thinning method with NumPy
+        backend is available. With the `local` bound, rate bounds are then
+        computed per segment of the schedule (see `random_step_schedule`),
+        which avoids phantom jumps when a stimulus switches genes on later.
+
+        Statistics of the run are stored in `meta['stats']` (see
+        `models.stats.SimulationStats`). With `profile=True`, the thinning
+        method also records jumps per gene, calls and time spent in each part
+        of the loop. The function `callback(t, x, stats)` is called by the
+        thinning method after recording each time point `t`, e.g. to report
+        progress of long runs.
+        """
         if init_state is None:
             init_state = np.zeros(self.n_genes)
 
         # Check simulation parameters
         time = utils.check_time_points(time).reshape((-1,))
         init_state = utils.check_init_state(init_state, shape=(self.n_genes,))
+        thinning = method == 'thinning' and backend == 'numpy'
+        if (profile or callback is not None) and not thinning:
+            msg = ('Profiling and callback are only available for the '
+                'thinning method with NumPy backend.')
+            raise ValueError(msg)
+        if self.schedule is not None and (profile or not thinning):
+            msg = ('Schedules are only available for the thinning method '
+                'with NumPy backend (without profiling).')
+            raise ValueError(msg)
+        stats = SimulationStats(self.n_genes, profile=profile)
+
+        # Optional: only simulate up to the final time and log bursts
+        if record == 'events':
+            events = EventLog(init_state, self.degradation_rate,
+                t_end=time[-1])
+        elif record == 'states':
+            events = None
+        else:
+            msg = "Record must be either 'states' or 'events'."
+            raise ValueError(msg)
+        time_sim = time[-1:] if record == 'events' else time
 
         # Define a random generator
         rng = np.random.default_rng(seed)
 
-        # Optional: record jump counts (phantom and true)
+        # Choose the simulation method
+        start = clock.perf_counter()
+        backend = compiled.check_backend(backend)
+        if backend == 'numba':
+            if method != 'thinning' or bound != 'global':
+                msg = ('Numba backend is only available for the thinning '
+                    'method with global bound.')
+                raise ValueError(msg)
+            if events is not None:
+                msg = 'Numba backend does not support recording events.'
+                raise ValueError(msg)
+            traj, n_jumps = self._thinning_compiled(time, init_state, rng)
+        elif method == 'next_reaction':
+            traj, n_jumps = next_reaction.simulate(self, time_sim, init_state,
+                rng, events)
+        elif method == 'thinning':
+            # Optional: run the loop on a copy with timed methods
+            model = instrument(self, stats) if profile else self
+            random_step = model._random_step(bound)
+            n_jumps = np.zeros(2, dtype=np.uint)
+            blocks = model._thinning(time_sim, init_state, rng, random_step,
+                n_jumps, chunk=time_sim.size, events=events, stats=stats,
+                callback=callback)
+            with model._split_interactions():
+                traj = np.concatenate(list(blocks))
+        elif method == 'tau_leap':
+            if events is not None:
+                msg = 'Tau-leaping does not support recording events.'
+                raise ValueError(msg)
+            random_step = self._random_step(bound)
+            if random_step == self.random_step_field:
+                random_step = self.random_step
+            n_jumps = np.zeros(2, dtype=np.uint)
+            n_leaps = np.zeros(2, dtype=np.uint)
+            with self._split_interactions():
+                traj = self._tau_leap(time, init_state, rng, random_step,
+                    n_jumps, n_leaps, epsilon)
+        else:
+            msg = ("Method must be either 'thinning', 'next_reaction' "
+                "or 'tau_leap'.")
+            raise ValueError(msg)
+        stats.set_jumps(n_jumps)
+        stats.finish(clock.perf_counter() - start)
+
+        # Display info about jumps
+        if verb and method == 'tau_leap':
+            msg = (f'Tau-leaping used {n_leaps[0]} leaps '
+                f'({n_leaps[1]} bursts) and {n_jumps.sum()} exact jumps '
+                f'including {n_jumps[0]} phantom jumps')
+            print(msg)
+        elif verb:
+            msg = (f'Exact simulation used {n_jumps.sum()} jumps '
+                f'including {n_jumps[0]} phantom jumps '
+                f'({100*n_jumps[0]/max(n_jumps.sum(), 1):.2f}%)')
+            print(msg)
+
+        if events is not None:
+            return events
+        info = {}
+        if method == 'tau_leap':
+            info = {'n_leaps': int(n_leaps[0]), 'n_bursts': int(n_leaps[1])}
+        meta = model_meta(self, seed=seed, method=method, bound=bound,
+            n_jumps=n_jumps, stats=stats, **info)
+        return Trajectory(time, traj, meta=meta)
+
+    def simulate_iter(self, time, init_state=None, seed=None, verb=False,
+        bound='global', chunk=1000):
+        """Perform exact simulation and yield the trajectory by blocks.
+
+        Yield pairs (t, x) where `t` contains at most `chunk` consecutive time
+        points and `x` the corresponding protein levels, so that memory usage
+        does not depend on the number of time points. Blocks can be written
+        to disk using the sinks of `models.recording`.
+        """
+        if init_state is None:
+            init_state = np.zeros(self.n_genes)
+
+        # Check simulation parameters
+        time = utils.check_time_points(time).reshape((-1,))
+        init_state = utils.check_init_state(init_state, shape=(self.n_genes,))
+
+        # Define a random generator
+        rng = np.random.default_rng(seed)
+
+        # Core loop for simulation and recording
+        random_step = self._random_step(bound)
         n_jumps = np.zeros(2, dtype=np.uint)
+        blocks = self._thinning(time, init_state, rng, random_step, n_jumps,
+            chunk)
+        with self._split_interactions():
+            for start, block in zip(range(0, time.size, chunk), blocks):
+                yield time[start:start+chunk], block
 
-        # Initialize trajectory array
-        traj = np.zeros((time.size, self.n_genes))
+        # Display info about jumps
+        if verb:
+            msg = (f'Exact simulation used {n_jumps.sum()} jumps '
+                f'including {n_jumps[0]} phantom jumps '
+                f'({100*n_jumps[0]/max(n_jumps.sum(), 1):.2f}%)')
+            print(msg)
+
+    @contextmanager
+    def _split_interactions(self):
+        """Prepare interactions once for the local bounds of a run.
+
+        The interaction matrix is split by sign and, if sparse, also stored
+        by columns for `kon_gene`. Both are cleared at the end of the run,
+        so that later changes of `inter` are always taken into account.
+        """
+        inter = self.network.inter
+        self._inter_split = split_interactions(inter)
+        if issparse(inter):
+            self._inter_columns = csc_array(inter)
+        try:
+            yield
+        finally:
+            self._inter_split = self._inter_columns = None
 
+    def _check_constant(self, name):
+        """Raise an error if the model has a schedule."""
+        if self.schedule is not None:
+            msg = f'Time-dependent schedules are not supported by {name}.'
+            raise ValueError(msg)
+
+    def _random_step(self, bound):
+        """Choose the random step function of the thinning method."""
+        if bound == 'global' and self.network.is_sparse:
+            return self.random_step_field
+        if bound == 'global':
+            return self.random_step
+        if bound == 'local':
+            return self.random_step_local
+        msg = "Rate bound must be either 'global' or 'local'."
+        raise ValueError(msg)
+
+    def _thinning(self, time, init_state, rng, random_step, n_jumps, chunk,
+        events=None, stats=None, callback=None):
+        """Core loop of the thinning method.
+
+        Yield the trajectory by blocks of `chunk` time points and record jump
+        counts (phantom and true) in `n_jumps`. If `events` is given, bursts
+        are also recorded in this event log. If `stats` is given with
+        profiling enabled, the model must be instrumented (see
+        `models.stats.instrument`).
+        """
+        profile = stats is not None and stats.profile
         # Initialize current time and state
         t, x = 0, init_state
 
         # Initialize previous time and state
         t_old, x_old = t, x
 
+        # Optional: incremental field (requires a common degradation rate)
+        field = random_step == self.random_step_field
+        if field and np.size(self.degradation_rate) > 1:
+            field, random_step = False, self.random_step
+        if field:
+            inter = csr_array(self.network.inter)
+
+        # Optional: time-dependent schedule (local bound if finite horizon)
+        scheduled = self.schedule is not None
+        if scheduled:
+            field = False
+            horizon = np.inf
+            if random_step == self.random_step_local:
+                horizon = self.default_horizon()
+
         # Core loop for simulation and recording
-        for k in range(time.size):
-            while t < time[k]:
+        for start in range(0, time.size, chunk):
 
-                # Update previous time and state
-                t_old, x_old = t, x
+            # Initialize trajectory block
+            block = np.zeros((min(chunk, time.size - start), self.n_genes))
 
-                # Update current time and state
-                u, x, is_jump = self.random_step(x, rng)
-                t += u
+            for k, time_k in enumerate(time[start:start+chunk]):
+                if field:
+                    # Avoid accumulation of rounding errors
+                    h = x @ inter
+                while t < time_k:
 
-                # Optional: record jump counts
-                n_jumps[int(is_jump)] += 1
+                    # Update previous time and state
+                    t_old, x_old = t, x
+
+                    # Update current time and state
+                    if profile:
+                        stats.last.clear()
+                    if field:
+                        u, x, h, is_jump = random_step(x, h, rng, inter)
+                    elif scheduled:
+                        u, x, is_jump = self.random_step_schedule(x, rng, t,
+                            horizon)
+                    else:
+                        u, x, is_jump = random_step(x, rng)
+                    t += u
+
+                    # Optional: record jump counts
+                    n_jumps[int(is_jump)] += 1
+                    if profile:
+                        self._profile_step(stats, u, x_old, x, is_jump)
+
+                    # Optional: record burst (the only component of the
+                    # state that differs from the flow)
+                    if is_jump and events is not None and t <= time[-1]:
+                        y = self.flow(u, x_old)
+                        i = np.flatnonzero(x != y)
+                        if i.size > 0:
+                            events.append(t, i[0], x[i[0]] - y[i[0]])
+
+                # Record protein levels
+                if profile:
+                    tic = clock.perf_counter()
+                    flow_time = stats.time['flow']
+                block[k] = self.flow(time_k - t_old, x_old)
+                if profile:
+                    stats.time['recording'] += (clock.perf_counter() - tic
+                        - (stats.time['flow'] - flow_time))
+                if callback is not None:
+                    callback(time_k, block[k], stats)
+
+            yield block
+
+    def _profile_step(self, stats, u, x_old, x, is_jump):
+        """Attribute the last step of the thinning method to a gene."""
+        if is_jump:
+            # Bursting gene: the only component that differs from the flow
+            y = BurstyGRN.flow(self, u, x_old)
+            i = np.flatnonzero(x != y)
+            if i.size > 0:
+                stats.real[i[0]] += 1
+        elif 'kon_gene' in stats.last:
+            # Local bound: phantom jump of the proposed gene
+            stats.phantom[stats.last['kon_gene'][0][1]] += 1
+        elif 'kon_bound' in stats.last:
+            # Local bound expired without any proposed jump
+            stats.expired += 1
+        else:
+            # Global bound: share of the rejected rate of each gene
+            name = 'kon_field' if 'kon_field' in stats.last else 'kon'
+            kon = stats.last[name][1]
+            k1 = np.broadcast_to(self.burst_frequency_max, (self.n_genes,))
+            w = k1 - kon
+            stats.phantom += w / max(np.sum(w), 1e-300)
+
+    def _tau_leap(self, time, init_state, rng, random_step, n_jumps, n_leaps,
+        epsilon, n_exact=100):
+        """Core loop of the tau-leaping method.
+
+        Steps are clipped to the next time point and reduced until midpoint
+        frequencies are accurate. If less than 10 bursts are expected during
+        a step, `n_exact` exact steps are performed instead.
+        Exact jumps (phantom and true) are counted in `n_jumps`, and leaps
+        and their bursts in `n_leaps`.
+        """
+        traj = np.zeros((time.size, self.n_genes))
+
+        # Initialize current time and state
+        t, x = 0, init_state
+
+        # Initialize previous time and state
+        t_old, x_old = t, x
+
+        # Core loop for simulation and recording
+        for k, time_k in enumerate(time):
+            while t < time_k:
+                kon = self.kon(x)
+                h = min(self.leap_size(x, kon, epsilon), time_k - t)
+                if np.sum(kon) * h >= 10:
+                    h, kon = self.midpoint_leap_size(x, kon, h, epsilon)
+                if np.sum(kon) * h >= 10:
+                    # Approximate step
+                    x, n = self.random_leap(x, kon, h, rng)
+                    t += h
+                    t_old, x_old = t, x
+                    n_leaps[0] += 1
+                    n_leaps[1] += np.sum(n)
+                    continue
+                # Exact steps
+                for _ in range(n_exact):
+                    t_old, x_old = t, x
+                    u, x, is_jump = random_step(x, rng)
+                    t += u
+                    n_jumps[int(is_jump)] += 1
+                    if t >= time_k:
+                        break
 
             # Record protein levels
-            traj[k] = self.flow(time[k] - t_old, x_old)
+            traj[k] = self.flow(time_k - t_old, x_old)
+
+        return traj
+
+    def _thinning_compiled(self, time, init_state, rng):
+        """Core loop of the thinning method (compiled version)."""
+        n_genes = self.n_genes
+        inter = csc_array(self.network.inter)
+        return compiled.bursty_grn_thinning(time, init_state.copy(),
+            np.broadcast_to(self.burst_frequency_min, n_genes).astype(float),
+            np.broadcast_to(self.burst_frequency_max, n_genes).astype(float),
+            np.broadcast_to(self.degradation_rate, n_genes).astype(float),
+            np.broadcast_to(self.burst_size, n_genes).astype(float),
+            self.network.basal.astype(float), inter.indptr, inter.indices,
+            inter.data.astype(float), float(self.rate_bound()),
+            compiled.kernel_seed(rng))
+
+    def simulate_population(self, time, n_cells, init_state=None, seed=None,
+        verb=False, bound='global'):
+        """Perform exact simulation of independent cells in parallel.
+
+        Each iteration advances every unfinished cell by one (real or phantom)
+        jump using array operations. The trajectory array `x` has shape
+        (n_cells, n_times, n_genes). Time points are either shared by all
+        cells or given for each cell with shape (n_cells, n_times), e.g. to
+        sample each cell at its own time. See `simulate` for the `bound`
+        option. The arrays of the schedule (if any) are shared by all cells,
+        whose local bounds expire at their own next breakpoint.
+        """
+        if init_state is None:
+            init_state = np.zeros(self.n_genes)
+
+        # Check simulation parameters
+        time = utils.check_cell_time_points(time, n_cells)
+        n_times = time.shape[-1]
+        time_cells = np.broadcast_to(time, (n_cells, n_times))
+        init_state = utils.check_init_state(init_state)
+        if np.shape(init_state) not in [(self.n_genes,),
+            (n_cells, self.n_genes)]:
+            msg = (f'Initial state must have shape ({self.n_genes},) '
+                f'or ({n_cells}, {self.n_genes}).')
+            raise ValueError(msg)
+        if bound not in ['global', 'local']:
+            msg = "Rate bound must be either 'global' or 'local'."
+            raise ValueError(msg)
+        local = bound == 'local'
+        horizon = self.default_horizon() if local else np.inf
+        schedule = self.schedule
+
+        # Define a random generator
+        rng = np.random.default_rng(seed)
+
+        # Optional: record jump counts (phantom and true)
+        n_jumps = np.zeros(2, dtype=np.uint)
+
+        # Initialize trajectory array
+        traj = np.zeros((n_cells, n_times, self.n_genes))
+
+        # Initialize current times and states of all cells
+        t = np.zeros(n_cells)
+        x = np.zeros((n_cells, self.n_genes))
+        x[:] = init_state
+
+        # Index of the next time point to record for each cell
+        k = np.zeros(n_cells, dtype=int)
+
+        cells = np.arange(n_cells)
+        with self._split_interactions():
+            while cells.size > 0:
+
+                # Compute rate bounds (local bounds are stacked gene-wise and
+                # expire at the next breakpoint of the schedule)
+                h = np.full(cells.size, horizon)
+                if local:
+                    if schedule is not None:
+                        h = np.minimum(h, schedule.next_breakpoint(t[cells])
+                            - t[cells])
+                    b = self.kon_bound(x[cells], h, t[cells])
+                    c = np.cumsum(b, axis=1)
+                    tau = c[:, -1]
+                else:
+                    tau = np.full(cells.size, self.rate_bound())
+
+                # Sample waiting times before next jump
+                with np.errstate(divide='ignore'):
+                    u = rng.standard_exponential(cells.size) / tau
+                expired = u > h
+                u[expired] = h[expired]
+                t_next = t[cells] + u
+
+                # Record protein levels at time points crossed by the step
+                while True:
+                    kc = np.minimum(k[cells], n_times - 1)
+                    crossed = k[cells] < n_times
+                    crossed &= time_cells[cells, kc] <= t_next
+                    if not np.any(crossed):
+                        break
+                    kc, crossed = kc[crossed], cells[crossed]
+                    traj[crossed, kc] = self.flow(
+                        (time_cells[crossed, kc] - t[crossed])[:, None],
+                        x[crossed])
+                    k[crossed] += 1
+
+                # Drop cells that have recorded all their time points
+                active = k[cells] < n_times
+                cells, u, t_next = cells[active], u[active], t_next[active]
+                tau, expired = tau[active], expired[active]
+
+                # Update states just before jump
+                y = self.flow(u[:, None], x[cells])
+                t[cells] = t_next
+
+                # Sample jump types
+                r = tau * rng.random(cells.size)
+                if local:
+                    # Gene i whose bound contains r, accepted if r falls
+                    # within the part of the bound covered by kon(y)[i]
+                    b, c = b[active], c[active]
+                    i = np.sum(c <= r[:, None], axis=1)
+                    i = np.minimum(i, self.n_genes - 1)
+                    j = np.arange(cells.size)
+                    kon = self.kon(y, t_next)
+                    is_jump = r - (c[j, i] - b[j, i]) < kon[j, i]
+                    is_jump &= ~expired
+                else:
+                    # i = 0, ..., n_genes-1 for a burst of protein i
+                    # and i = n_genes for a phantom jump
+                    v = np.cumsum(self.kon(y, t_next), axis=1)
+                    i = np.sum(v <= r[:, None], axis=1)
+                    is_jump = i < self.n_genes
+
+                # Perform the jumps
+                n = np.sum(is_jump)
+                y[is_jump, i[is_jump]] += rng.exponential(
+                    self.gene_burst_size(i[is_jump]))
+                x[cells] = y
+
+                # Optional: record jump counts
+                n_jumps[0] += cells.size - n
+                n_jumps[1] += n
 
         # Display info about jumps
         if verb:
-            msg = (f'Exact simulation used {n_jumps.sum()} jumps '
-                f'including {n_jumps[0]} phantom jumps '
-                f'({100*n_jumps[0]/n_jumps.sum():.2f}%)')
+            msg = (f'Exact simulation of {n_cells} cells used '
+                f'{n_jumps.sum()} jumps including {n_jumps[0]} phantom jumps '
+                f'({100*n_jumps[0]/max(n_jumps.sum(), 1):.2f}%)')
+            print(msg)
+
+        meta = model_meta(self, seed=seed, bound=bound, n_jumps=n_jumps)
+        return TrajectoryBatch(time, traj, meta=meta)
+
+    def sample_stationary(self, n_samples, n_chains=8, seed=None, verb=False,
+        bound='global', threshold=1.01, max_time=None):
+        """Sample protein levels from the stationary distribution.
+
+        Parallel chains are started from overdispersed initial states and
+        simulated on a grid of step 1/(10*d). The simulated duration is
+        doubled until the split R-hat computed on the second half is below
+        `threshold` for every gene, which gives the burn-in time. The chains
+        are then thinned according to the effective sample size (ESS) of the
+        least mixing gene, so that returned samples are approximately
+        independent. The result has
+        shape (n_samples, n_genes).
+        """
+        self._check_constant('stationary sampling')
+        n_genes = self.n_genes
+        rng = np.random.default_rng(seed)
+        dt = self.default_horizon() / 10
+        if max_time is None:
+            max_time = 1e4 * self.default_horizon()
+
+        # Overdispersed initial states (up to twice the maximal mean level)
+        k1 = self.burst_frequency_max
+        scale = self.burst_size * k1 / self.degradation_rate
+        x = rng.uniform(0, 2, (n_chains, n_genes)) * scale
+
+        # Double the duration until the second half has converged
+        chains = np.zeros((n_chains, 0, n_genes))
+        n_new = 100
+        while True:
+            time = dt * np.arange(1, n_new + 1)
+            sim = self.simulate_population(time, n_chains, init_state=x,
+                seed=rng, bound=bound)
+            chains = np.concatenate([chains, sim.x], axis=1)
+            x = sim.x[:, -1]
+            n = chains.shape[1]
+            rhat = np.max(split_rhat(chains[:, n//2:]))
+            if rhat < threshold:
+                break
+            if n * dt >= max_time:
+                msg = (f'R-hat is still {rhat:.4f} after a burn-in time of '
+                    f'{n*dt/2:.4g}: consider increasing max_time.')
+                warnings.warn(msg, RuntimeWarning, stacklevel=2)
+                break
+            n_new = n
+        burn_in = n // 2
+
+        # Thinning based on the effective sample size
+        ess = np.min(effective_sample_size(chains[:, burn_in:]))
+        tau = n_chains * (n - burn_in) / ess
+        lag = max(1, int(np.ceil(tau)))
+
+        # Reuse draws after burn-in and simulate additional draws if needed
+        samples = chains[:, burn_in::lag]
+        n_draws = int(np.ceil(n_samples / n_chains))
+        if samples.shape[1] < n_draws:
+            # Index of the next draw (the current state has index n-1)
+            start = burn_in + lag * samples.shape[1] - (n - 1)
+            time = dt * (start + lag * np.arange(n_draws - samples.shape[1]))
+            sim = self.simulate_population(time, n_chains, init_state=x,
+                seed=rng, bound=bound)
+            samples = np.concatenate([samples, sim.x], axis=1)
+        samples = samples[:, :n_draws].transpose((1, 0, 2))
+
+        # Display info about convergence
+        if verb:
+            msg = (f'Burn-in time {burn_in*dt:.4g} (R-hat = {rhat:.4f}), '
+                f'ESS {ess:.0f} over {n_chains*(n - burn_in)} draws, '
+                f'thinning lag {lag*dt:.4g} ({n_draws} draws from '
+                f'{n_chains} chains)')
             print(msg)
 
-        return Trajectory(time, traj)
+        return samples.reshape((-1, n_genes))[:n_samples]
+
+    def moments(self, time, init_state=None, init_cov=None, verb=False,
+        method='LSODA', rtol=1e-6, atol=1e-9):
+        """Approximate the mean and covariance of protein levels over time.
+
+        This is the linear noise approximation: the mean m follows the limit
+        model m' = b*kon(m) - d*m and the covariance S is obtained from the
+        linearization around m, namely S' = A*S + S*A^T + diag(2*b^2*kon(m))
+        where A = b*J(m) - diag(d) and J is the Jacobian of `kon`. The burst
+        term is the second moment of exponential bursts of mean b.
+
+        The approximation is accurate when the limit model converges to a
+        stable equilibrium and bursts are small. It is not meaningful around
+        unstable equilibria (e.g. oscillating or bistable networks), where
+        the covariance grows exponentially.
+
+        Return arrays `mean` and `cov` with shapes (n_times, n_genes) and
+        (n_times, n_genes, n_genes), obtained from a single run of the ODE
+        solver `method` (see `scipy.integrate.solve_ivp`).
+        """
+        self._check_constant('moment equations')
+        n_genes = self.n_genes
+        if init_state is None:
+            init_state = np.zeros(n_genes)
+        if init_cov is None:
+            init_cov = np.zeros((n_genes, n_genes))
+
+        # Check simulation parameters
+        time = utils.check_time_points(time).reshape((-1,))
+        init_state = utils.check_init_state(init_state, shape=(n_genes,))
+        init_cov = np.array(init_cov, dtype=float)
+        if init_cov.shape != (n_genes, n_genes):
+            msg = f'Initial covariance must have shape ({n_genes}, {n_genes}).'
+            raise ValueError(msg)
+
+        k0 = self.burst_frequency_min
+        k1 = self.burst_frequency_max
+        basal = self.network.basal
+        inter = self.network.inter
+        if issparse(inter):
+            inter = inter.toarray()
+        b = np.broadcast_to(self.burst_size, (n_genes,))
+        d = np.broadcast_to(self.degradation_rate, (n_genes,))
+
+        def field(t, z):
+            m, s = z[:n_genes], z[n_genes:].reshape((n_genes, n_genes))
+            kon = kon_sigmoid(m, k0, k1, basal, inter)
+            a = b[:, None] * kon_sigmoid_jacobian(m, k0, k1, basal, inter)
+            a[np.diag_indices(n_genes)] -= d
+            ds = a @ s
+            ds += ds.T
+            ds[np.diag_indices(n_genes)] += 2 * b**2 * kon
+            return np.concatenate([b*kon - d*m, ds.reshape(-1)])
+
+        z0 = np.concatenate([init_state, init_cov.reshape(-1)])
+        if time[-1] == 0:
+            mean = np.tile(init_state, (time.size, 1))
+            cov = np.tile(init_cov, (time.size, 1, 1))
+            return mean, (cov + cov.transpose((0, 2, 1))) / 2
+        sol = solve_ivp(field, (0, time[-1]), z0, method=method,
+            t_eval=time, rtol=rtol, atol=atol)
+        if not sol.success:
+            raise RuntimeError(sol.message)
+        if verb:
+            print(f'Moment equations used {sol.t.size} time points '
+                f'({sol.nfev} evaluations)')
+        mean = sol.y[:n_genes].T
+        cov = sol.y[n_genes:].T.reshape((time.size, n_genes, n_genes))
+        # Enforce symmetry (removes rounding errors)
+        return mean, (cov + cov.transpose((0, 2, 1))) / 2
+
+    def stationary_density(self, grid, rtol=1e-10, verb=False):
+        """Solve the stationary Kolmogorov forward equation on a grid.
+
+        The `grid` contains the edges of cells along each gene, starting at
+        0 (one array shared by all genes or one array per gene), the last
+        cell absorbing all bursts beyond the grid. Only networks of 1 to 3
+        genes are supported. Return the stationary density at cell centers,
+        with shape (n_1, ..., n_G) where n_i is the number of cells of gene i.
+
+        The equation is discretized by finite volumes: the decay flow moves
+        probability towards 0 (upwind fluxes) and bursts from a cell land in
+        cells above with exponential probabilities. The inflow of bursts is
+        a convolution with an exponential kernel, computed by a recursion
+        along each gene, so that applying the operator costs O(grid). The
+        sparse linear system is solved by GMRES (relative tolerance `rtol`),
+        preconditioned by the flow and burst outflow part, which is upper
+        triangular and hence solved by a single backward sweep.
+        """
+        self._check_constant('the stationary density')
+        n_genes = self.n_genes
+        if n_genes > 3:
+            msg = 'Stationary density is only available for 1 to 3 genes.'
+            raise ValueError(msg)
+        if np.ndim(grid[0]) == 0:
+            grid = [grid] * n_genes
+        if len(grid) != n_genes:
+            msg = f'Grid must be given for {n_genes} genes.'
+            raise ValueError(msg)
+        edges = [np.asarray(e, dtype=float) for e in grid]
+        for e in edges:
+            if e.ndim != 1 or e.size < 3 or e[0] != 0 or np.any(
+                np.diff(e) <= 0):
+                msg = ('Grid must be increasing from 0 with at least 2 '
+                    'cells per gene.')
+                raise ValueError(msg)
+        shape = tuple(e.size - 1 for e in edges)
+        size = int(np.prod(shape))
+
+        # Burst frequencies at cell centers
+        centers = [(e[1:] + e[:-1]) / 2 for e in edges]
+        points = np.stack(np.meshgrid(*centers, indexing='ij'), axis=-1)
+        kon = self.kon(points.reshape((size, n_genes)))
+        b = np.broadcast_to(self.burst_size, (n_genes,))
+        d = np.broadcast_to(self.degradation_rate, (n_genes,))
+
+        def lift(m, i):
+            """Operator `m` acting along gene i."""
+            ops = [eye_array(n) for n in shape]
+            ops[i] = m
+            op = ops[0]
+            for o in ops[1:]:
+                op = kron(op, o, format='csr')
+            return op
+
+        # Flow and burst outflow (upper triangular in C order)
+        outflow = csr_array((size, size))
+        kernels = []
+        for i, e in enumerate(edges):
+            n, h, c = shape[i], np.diff(e), centers[i]
+            # Decay flow: flux from cell j to j-1 across edge e[j]
+            v = d[i] * e[:-1] / h
+            flow = diags_array([-v, v[1:]], offsets=[0, 1], shape=(n, n))
+            # Bursts leaving cell j (except the last one, which keeps them)
+            r = np.exp(-(e[1:] - c) / b[i])
+            r[-1] = 0
+            k = diags_array(kon[:, i])
+            outflow += lift(flow, i) - lift(diags_array(r), i) @ k
+            # Kernel: s[m] = q[m-1]*s[m-1] + r[m-1]*(kon*p)[m-1] collects
+            # bursts from below and cell m receives a fraction f[m] of s[m]
+            q = np.exp(-h / b[i])
+            f = 1 - q
+            f[-1] = 1
+            kernels.append((q, r, f))
+
+        def inflow(p):
+            """Inflow of bursts (exponential kernel convolution)."""
+            y = np.zeros(shape)
+            for i, (q, r, f) in enumerate(kernels):
+                u = np.moveaxis((kon[:, i] * p).reshape(shape), i, 0)
+                s = np.zeros(u.shape)
+                for m in range(1, shape[i]):
+                    s[m] = q[m-1] * s[m-1] + r[m-1] * u[m-1]
+                y += np.moveaxis(f.reshape((-1,) + (1,)*(n_genes-1)) * s,
+                    0, i)
+            return y.reshape(-1)
+
+        # The balance of a reference cell at typical levels b*kon/d is
+        # replaced by p = 1, then probabilities are normalized
+        typical = b * np.mean(kon, axis=0) / d
+        ref = np.ravel_multi_index(tuple(min(np.searchsorted(e, m) - 1,
+            e.size - 2) for e, m in zip(edges, typical)), shape)
+
+        def operator(p):
+            y = outflow @ p + inflow(p)
+            y[ref] = p[ref]
+            return y
+
+        rhs = np.zeros(size)
+        rhs[ref] = 1
+        sweep = splu(csc_array(outflow), permc_spec='NATURAL')
+        iterations = []
+        p, info = gmres(LinearOperator((size, size), operator), rhs,
+            M=LinearOperator((size, size), sweep.solve), rtol=rtol,
+            restart=100, maxiter=100, callback=iterations.append,
+            callback_type='pr_norm')
+        if info != 0:
+            msg = f'GMRES did not converge after {len(iterations)} iterations.'
+            raise RuntimeError(msg)
+        if verb:
+            print(f'Stationary density: {size} cells, {len(iterations)} '
+                f'GMRES iterations')
+
+        # Convert cell probabilities into densities
+        p = np.maximum(p, 0) / np.sum(p)
+        volume = np.ones(shape)
+        for i, e in enumerate(edges):
+            volume = volume * np.diff(e).reshape((-1,) + (1,)*(n_genes-1-i))
+        return p.reshape(shape) / volume
 
 
 # Tests
@@ -137,3 +1113,59 @@ if __name__ == '__main__':
     sim = model.simulate(time, verb=True, seed=0)
     print(sim.t)
     print(sim.x)
+    # Simulation using local rate bounds
+    sim = model.simulate(time, verb=True, seed=0, bound='local')
+    print(sim.x)
+    # Simulation with profiling
+    sim = model.simulate(time, seed=0, profile=True)
+    print(sim.meta['stats'].summary())
+    # Approximate simulation with high burst frequencies
+    fast = BurstyGRN(toggle_switch, burst_size=1e-3, burst_frequency_max=2e3)
+    sim = fast.simulate(time, verb=True, seed=0, method='tau_leap')
+    print(sim.x)
+    # Simulation without thinning
+    sim = model.simulate(time, verb=True, seed=0, method='next_reaction')
+    print(sim.x)
+    # Simulation of a population of cells
+    sim = model.simulate_population(time, n_cells=1000, verb=True, seed=0)
+    print(sim.x.mean(axis=0))
+    # Event log evaluated at given time points
+    events = model.simulate(time, seed=0, record='events')
+    print(events.evaluate(time))
+    # Stationary distribution
+    x = model.sample_stationary(1000, verb=True, seed=0)
+    print(x.mean(axis=0))
+    # Stationary density (finite volumes)
+    grid = np.linspace(0, 6, 101)
+    p = model.stationary_density(grid, verb=True)
+    x = (grid[1:] + grid[:-1]) / 2
+    print(np.sum(p.sum(axis=1) * x) * np.diff(grid)[0]**2)
+    # Comparison with the Gamma distribution (no regulation)
+    from models_solution.bursty_base import BurstyBase
+    single = BurstyGRN(Network(1), burst_size=0.5, burst_frequency_min=3,
+        burst_frequency_max=3)
+    grid = np.linspace(0, 10, 1001)
+    p = single.stationary_density(grid)
+    x = (grid[1:] + grid[:-1]) / 2
+    base = BurstyBase(burst_size=0.5, burst_frequency=3)
+    print(np.max(np.abs(p - base.stationary_density(x))))
+    # Linear noise approximation (compared with Monte Carlo)
+    network = Network.from_edges(3, [(0, 1), (1, 2), (0, 2)], [2, 2, -1],
+        basal=-1)
+    model = BurstyGRN(network, burst_size=0.2, burst_frequency_max=10)
+    mean, cov = model.moments(time, verb=True)
+    sim = model.simulate_population(time, n_cells=10000, seed=0)
+    print(mean[-1], sim.x[:, -1].mean(axis=0))
+    print(np.diag(cov[-1]), sim.x[:, -1].var(axis=0))
+    mean, cov = model.moments([0], init_state=[1, 0, 0])
+    print(mean, cov.shape)
+    # Stimulus switching on the first gene of a cascade at t = 5
+    network = Network.from_edges(3, [(0, 1), (1, 2)], 8, basal=-6,
+        sparse=False)
+    schedule = Schedule.stimulus([0, 5], [0, 1], [10, 0, 0])
+    model = BurstyGRN(network, burst_frequency_max=20, schedule=schedule)
+    time = np.linspace(0, 10, 5)
+    for bound in ['global', 'local']:
+        sim = model.simulate_population(time, n_cells=100, seed=0,
+            verb=True, bound=bound)
+        print(sim.x.mean(axis=0)[:, -1])
@@ -0,0 +1,129 @@
+"""Event logs of exact simulations (jump times and burst sizes)."""
+import numpy as np
+import models._utils as utils
+
+
+class EventLog:
+    """Store the bursts of a simulation in growable arrays.
+
+    Each burst is stored as a time (float64), a gene index (int16 or int32)
+    and a burst size (float32). Since protein levels follow the closed-form
+    flow between bursts, the trajectory can be rebuilt at any time points
+    up to `t_end` using `evaluate`, without running the simulation again.
+    """
+
+    def __init__(self, init_state, degradation_rate, t_end=np.inf,
+        capacity=1024):
+        self.init_state = np.array(init_state, dtype=float)
+        self.degradation_rate = degradation_rate
+        self.t_end = t_end
+        self.n_genes = max(self.init_state.size, 1)
+        # Arrays are only filled up to `size` and grown when needed
+        gene_dtype = np.int16 if self.n_genes <= 2**15 else np.int32
+        self.size = 0
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._genes = np.zeros(capacity, dtype=gene_dtype)
+        self._sizes = np.zeros(capacity, dtype=np.float32)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def times(self):
+        """Burst times."""
+        return self._times[:self.size]
+
+    @property
+    def genes(self):
+        """Index of the bursting gene for each burst."""
+        return self._genes[:self.size]
+
+    @property
+    def sizes(self):
+        """Burst sizes."""
+        return self._sizes[:self.size]
+
+    @property
+    def nbytes(self):
+        """Memory used by the stored bursts."""
+        return self.times.nbytes + self.genes.nbytes + self.sizes.nbytes
+
+    def _reserve(self, n):
+        """Make room for `n` additional bursts (geometric growth)."""
+        capacity = self._times.size
+        if self.size + n <= capacity:
+            return
+        capacity = max(2 * capacity, self.size + n)
+        for name in ['_times', '_genes', '_sizes']:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, t, gene, size):
+        """Record a single burst."""
+        self._reserve(1)
+        k = self.size
+        self._times[k], self._genes[k], self._sizes[k] = t, gene, size
+        self.size += 1
+
+    def extend(self, t, genes, sizes):
+        """Record several bursts given in increasing time order."""
+        t = np.asarray(t)
+        self._reserve(t.size)
+        k = slice(self.size, self.size + t.size)
+        self._times[k], self._genes[k], self._sizes[k] = t, genes, sizes
+        self.size += t.size
+
+    def evaluate(self, time):
+        """Rebuild protein levels at given time points.
+
+        Return an array of shape (n_times, n_genes), or (n_times,) if the
+        initial state is a scalar value. Bursts occurring exactly at a time
+        point are included.
+        """
+        time = utils.check_time_points(time).reshape((-1,))
+        if time.size > 0 and time[-1] > self.t_end:
+            msg = f'Time points must not exceed t_end = {self.t_end}.'
+            raise ValueError(msg)
+        x0 = self.init_state.reshape((-1,))
+        d = np.broadcast_to(self.degradation_rate, (self.n_genes,))
+        traj = np.zeros((time.size, self.n_genes))
+
+        # Group bursts by gene while keeping the time order
+        order = np.argsort(self.genes, kind='stable')
+        bounds = np.searchsorted(self.genes[order], np.arange(self.n_genes+1))
+
+        for i in range(self.n_genes):
+            k = order[bounds[i]:bounds[i+1]]
+            t = np.append(0, self.times[k])
+            x = embedded_chain(t, np.append(x0[i], self.sizes[k]), d[i])
+            # Index of the last burst before each time point
+            j = np.searchsorted(t, time, side='right') - 1
+            traj[:, i] = x[j] * np.exp(- d[i] * (time - t[j]))
+
+        return traj.reshape(time.shape + self.init_state.shape)
+
+
+def embedded_chain(t, h, degradation_rate):
+    """Compute the post-jump embedded Markov chain (along the last axis).
+
+    The recurrence x[k] = x[k-1] * exp(-d*(t[k]-t[k-1])) + h[k] is solved by
+    x[k] = exp(-d*t[k]) * sum(h[j] * exp(d*t[j]) for j <= k), where the sum
+    is computed in log domain for long horizons (to avoid overflow).
+    """
+    s = degradation_rate * t
+    if np.max(s, initial=0) < 500:
+        return np.exp(- s) * np.cumsum(h * np.exp(s), axis=-1)
+    with np.errstate(divide='ignore'):
+        log_h = np.log(h)
+    return np.exp(np.logaddexp.accumulate(log_h + s, axis=-1) - s)
+
+
+# Tests
+if __name__ == '__main__':
+    events = EventLog(init_state=[1.0, 0.0], degradation_rate=1.0, t_end=3)
+    events.append(0.5, 1, 2.0)
+    events.extend([1.0, 2.0], [0, 1], [1.0, 0.5])
+    print(events.times, events.genes, events.sizes)
+    print(events.evaluate(np.linspace(0, 3, 4)))
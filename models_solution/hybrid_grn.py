@@ -0,0 +1,186 @@
+"""Hybrid simulation of the Bursty model for a gene regulatory network.
+
+Genes with high burst frequencies relative to their degradation rate
+(`fast` genes) follow the deterministic limit drift, as in `LimitGRN`,
+while the other (`slow`) genes keep exact bursts simulated by thinning.
+Both parts are coupled through the burst frequencies `kon`, so that the
+cost only depends on the bursts of slow genes.
+"""
+import numpy as np
+import models._utils as utils
+from models.trajectory import Trajectory, model_meta
+from models.networks import Network, kon_sigmoid
+from models_solution.bursty_grn import BurstyGRN
+
+
+class HybridGRN(BurstyGRN):
+    """Bursty model with deterministic fast genes.
+
+    Genes such that `burst_frequency_max / degradation_rate` is at least
+    `threshold` are considered fast, unless `fast_genes` is set to a list of
+    gene indices or a boolean mask. Only `simulate` is hybrid: the other
+    methods inherited from `BurstyGRN` simulate the exact model.
+    """
+
+    def __init__(self, network: Network,
+        burst_size=1.0,
+        burst_frequency_min=0.0,
+        burst_frequency_max=2.0,
+        degradation_rate=1.0,
+        fast_genes=None,
+        threshold=50.0):
+
+        super().__init__(network, burst_size, burst_frequency_min,
+            burst_frequency_max, degradation_rate)
+
+        # Set partition parameters
+        self.fast_genes = fast_genes
+        self.threshold = threshold
+
+    def partition(self):
+        """Indices of fast and slow genes."""
+        fast = np.zeros(self.n_genes, dtype=bool)
+        if self.fast_genes is None:
+            k1 = self.burst_frequency_max
+            d = self.degradation_rate
+            fast[:] = k1 / d >= self.threshold
+        else:
+            fast[self.fast_genes] = True
+        return np.flatnonzero(fast), np.flatnonzero(~fast)
+
+    def default_step(self):
+        """Default step size of the Runge-Kutta method for fast genes."""
+        return 5e-2 / np.max(self.degradation_rate)
+
+    def simulate(self, time, init_state=None, seed=None, verb=False,
+        step=None):
+        """Perform hybrid simulation (extracted at given time points).
+
+        Slow genes burst by thinning with the global bound of their burst
+        frequencies. Between proposed bursts, fast genes are integrated by
+        the classic Runge-Kutta method with step size at most `step`, and
+        slow genes follow the exact flow.
+        """
+        if init_state is None:
+            init_state = np.zeros(self.n_genes)
+        if step is None:
+            step = self.default_step()
+
+        # Check simulation parameters
+        time = utils.check_time_points(time).reshape((-1,))
+        init_state = utils.check_init_state(init_state, shape=(self.n_genes,))
+
+        # Define a random generator
+        rng = np.random.default_rng(seed)
+
+        # Core loop for simulation and recording
+        fast, slow = self.partition()
+        n_jumps = np.zeros(2, dtype=np.uint)
+        n_steps = np.zeros(1, dtype=np.uint)
+        traj = self._hybrid(time, init_state, rng, fast, slow, step, n_jumps,
+            n_steps)
+
+        # Display info about jumps and steps
+        if verb:
+            msg = (f'Hybrid simulation of {fast.size} fast and {slow.size} '
+                f'slow genes used {n_jumps.sum()} jumps including '
+                f'{n_jumps[0]} phantom jumps and {n_steps[0]} ODE steps')
+            print(msg)
+
+        meta = model_meta(self, seed=seed, fast_genes=fast, n_jumps=n_jumps,
+            n_steps=int(n_steps[0]))
+        return Trajectory(time, traj, meta=meta)
+
+    def _hybrid(self, time, init_state, rng, fast, slow, step, n_jumps,
+        n_steps):
+        """Core loop of the hybrid method."""
+        n_genes = self.n_genes
+        k0 = np.broadcast_to(self.burst_frequency_min, (n_genes,))
+        k1 = np.broadcast_to(self.burst_frequency_max, (n_genes,))
+        b = np.broadcast_to(self.burst_size, (n_genes,))
+        d = np.broadcast_to(self.degradation_rate, (n_genes,))
+        basal = self.network.basal
+        inter = self.network.inter
+
+        # Parameters of each part
+        fast_params = k0[fast], k1[fast], basal[fast], inter[:, fast]
+        slow_params = k0[slow], k1[slow], basal[slow], inter[:, slow]
+        tau = np.sum(k1[slow])
+
+        def drift(x):
+            """Limit drift for fast genes and decay for slow genes."""
+            v = - d * x
+            v[fast] += b[fast] * kon_sigmoid(x, *fast_params)
+            return v
+
+        def flow(h, x):
+            """Hybrid flow during time `h`."""
+            if fast.size == 0:
+                return self.flow(h, x)
+            n = max(int(np.ceil(h / step)), 1)
+            dt = h / n
+            y = x
+            for _ in range(n):
+                v1 = drift(y)
+                v2 = drift(y + dt/2 * v1)
+                v3 = drift(y + dt/2 * v2)
+                v4 = drift(y + dt * v3)
+                y = y + dt/6 * (v1 + 2*v2 + 2*v3 + v4)
+            n_steps[0] += n
+            # Exact flow of slow genes
+            y[slow] = x[slow] * np.exp(- d[slow] * h)
+            return y
+
+        traj = np.zeros((time.size, n_genes))
+
+        # Initialize current time and state
+        t, x = 0, init_state
+
+        # Core loop for simulation and recording
+        for k, time_k in enumerate(time):
+            while True:
+                # Sample waiting time before next proposed burst (the
+                # remaining time is resampled after each time point)
+                u = rng.exponential(scale=1/tau) if tau > 0 else np.inf
+                if t + u >= time_k:
+                    x = flow(time_k - t, x)
+                    t = time_k
+                    break
+                x = flow(u, x)
+                t += u
+
+                # Sample the slow gene or phantom jump (i = 0)
+                v = np.zeros(slow.size + 1)
+                v[1:] = kon_sigmoid(x, *slow_params) / tau
+                v[0] = 1 - np.sum(v[1:])
+                i = np.searchsorted(np.cumsum(v), rng.random(), side='right')
+
+                # Perform the jump
+                n_jumps[int(i > 0)] += 1
+                if i > 0:
+                    x[slow[i-1]] += rng.exponential(b[slow[i-1]])
+
+            # Record protein levels
+            traj[k] = x
+
+        return traj
+
+
+# Tests
+if __name__ == '__main__':
+    import time as clock
+    from models.networks import repressilator
+    # Repressilator with one fast gene
+    b, k1 = np.array([0.002, 0.5, 0.5]), np.array([500, 2, 2])
+    model = HybridGRN(repressilator, burst_size=b, burst_frequency_max=k1)
+    time = np.linspace(0, 50, 6)
+    sim = model.simulate(time, verb=True, seed=0)
+    print(sim.x)
+    # Comparison with exact simulation
+    exact = BurstyGRN(repressilator, burst_size=b, burst_frequency_max=k1)
+    time = np.linspace(0, 10, 3)
+    for m in [model, exact]:
+        start = clock.perf_counter()
+        x = np.array([m.simulate(time, seed=s).x[-1] for s in range(50)])
+        print(f'{type(m).__name__}: {clock.perf_counter() - start:.2f}s',
+            np.mean(x, axis=0), np.std(x, axis=0))
@@ -1,15 +1,30 @@
 """Simulation of the limit model for a gene regulatory network."""
+import time as clock
 import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.sparse import (
+    block_array,
+    block_diag,
+    bsr_array,
+    csr_array,
+    diags_array,
+    eye_array,
+    issparse,
+    kron,
+)
+from scipy.special import expit
 import models._utils as utils
-from models.networks import Network, kon_sigmoid
+from models.stats import SimulationStats, instrument
+from models.trajectory import Trajectory, TrajectoryBatch, model_meta
+from models.networks import Network, kon_sigmoid, kon_sigmoid_jacobian
 
+# Adaptive integrators (see `scipy.integrate.solve_ivp`)
+EXPLICIT_METHODS = ['RK45', 'RK23', 'DOP853']
+IMPLICIT_METHODS = ['Radau', 'BDF', 'LSODA']
 
-class Trajectory:
-    """Store single-cell gene expression trajectories."""
-
-    def __init__(self, t, x):
-        self.t = t  # Time points
-        self.x = x  # Protein levels
+# Parameters of sensitivities and gradients (per gene except `inter`)
+PARAMETERS = ['basal', 'inter', 'burst_size', 'burst_frequency_min',
+    'burst_frequency_max', 'degradation_rate']
 
 
 class LimitGRN:
@@ -39,14 +54,238 @@ class LimitGRN:
         inter = self.network.inter
         return kon_sigmoid(x, k0, k1, basal, inter)
 
+    def drift(self, t, x):
+        """Define the vector field of the limit model."""
+        burst_size = self.burst_size
+        degradation_rate = self.degradation_rate
+        return burst_size*self.kon(x) - degradation_rate*x
+
+    def jacobian(self, t, x):
+        """Jacobian matrix of the vector field (analytic)."""
+        k0 = self.burst_frequency_min
+        k1 = self.burst_frequency_max
+        basal = self.network.basal
+        inter = self.network.inter
+        burst_size = np.broadcast_to(self.burst_size, (self.n_genes,))
+        degradation_rate = np.broadcast_to(self.degradation_rate,
+            (self.n_genes,))
+        jac = kon_sigmoid_jacobian(x, k0, k1, basal, inter)
+        if issparse(jac):
+            jac = diags_array(burst_size) @ jac
+            return jac - diags_array(degradation_rate)
+        return burst_size[:, None]*jac - np.diag(degradation_rate)
+
+    def parameter_jacobian(self, x):
+        """Derivatives of the vector field with respect to parameters.
+
+        Return a sparse array of shape (n_genes, n_params), the parameters
+        being ordered as in `PARAMETERS`: per-gene values of all parameters
+        except `inter`, whose parameters are the entries given by
+        `inter_pattern`. The analytic derivative of `kon_sigmoid` is used.
+        """
+        n_genes = self.n_genes
+        k0 = np.broadcast_to(self.burst_frequency_min, (n_genes,))
+        k1 = np.broadcast_to(self.burst_frequency_max, (n_genes,))
+        b = np.broadcast_to(self.burst_size, (n_genes,))
+        sigma = expit(self.network.basal + x @ self.network.inter)
+        kon = (1 - sigma)*k0 + sigma*k1
+        slope = b * (k1 - k0) * sigma * (1 - sigma)
+        rows, cols = self.inter_pattern()
+        genes = np.arange(n_genes)
+        data = [slope, slope[cols] * x[rows], kon, b*(1 - sigma), b*sigma, -x]
+        targets = [genes, cols, genes, genes, genes, genes]
+        return csr_array((np.concatenate(data), (np.concatenate(targets),
+            np.arange(5*n_genes + rows.size))),
+            shape=(n_genes, 5*n_genes + rows.size))
+
+    def inter_pattern(self):
+        """Entries (regulator, target) of `inter` used as parameters.
+
+        These are the stored entries of a sparse interaction matrix (in CSR
+        order) or all entries of a dense one (in C order).
+        """
+        inter = self.network.inter
+        if issparse(inter):
+            inter = csr_array(inter)
+            rows = np.repeat(np.arange(self.n_genes), np.diff(inter.indptr))
+            return rows, inter.indices
+        rows, cols = np.indices((self.n_genes, self.n_genes))
+        return rows.reshape(-1), cols.reshape(-1)
+
+    def _split_parameters(self, values):
+        """Split values along the last axis into a dict of parameters."""
+        n_genes = self.n_genes
+        n_inter = self.inter_pattern()[0].size
+        sizes = [n_genes, n_inter] + [n_genes] * 4
+        blocks = np.split(values, np.cumsum(sizes)[:-1], axis=-1)
+        return dict(zip(PARAMETERS, blocks))
+
     def euler_step(self, dt, x):
         """Perform basic Euler step for the limit model."""
         burst_size = self.burst_size
         degradation_rate = self.degradation_rate
         return (1 - dt*degradation_rate)*x + dt*burst_size*self.kon(x)
 
-    def simulate(self, time, init_state=None, verb=False):
-        """Perform basic simulation (extracted at given time points)."""
+    def simulate(self, time, init_state=None, verb=False, method='euler',
+        rtol=1e-6, atol=1e-9, profile=False, callback=None,
+        sensitivities=False):
+        """Perform basic simulation (extracted at given time points).
+
+        The default `euler` method uses a fixed step size. Otherwise, `method`
+        is an adaptive integrator: explicit Runge-Kutta methods with error
+        control (`RK45` is Dormand-Prince) or stiff methods using the analytic
+        Jacobian (`Radau`, `BDF`, `LSODA`). The trajectory is then obtained
+        from the dense output of the integrator at the given time points.
+
+        Statistics of the run are stored in `meta['stats']`: with
+        `profile=True`, they include the number of calls and time spent in
+        `kon`. The function `callback(t, x, stats)` is called for each time
+        point after it is recorded (Euler) or after its block is integrated.
+
+        With `sensitivities=True`, the forward sensitivity equations S' =
+        J*S + F are solved together with the trajectory, where J and F are
+        the derivatives of the vector field with respect to the state and
+        parameters (see `parameter_jacobian`). Derivatives of the trajectory
+        are stored in `meta['sensitivities']`, a dict of arrays with shapes
+        (n_times, n_genes, n_params) for each name in `PARAMETERS`. This is
+        efficient for few parameters: for the gradient of a scalar loss with
+        respect to many parameters, use `gradient` instead.
+        """
+        if init_state is None:
+            init_state = np.zeros(self.n_genes)
+
+        # Check simulation parameters
+        time = utils.check_time_points(time).reshape((-1,))
+        init_state = utils.check_init_state(init_state, shape=(self.n_genes,))
+        stats = SimulationStats(self.n_genes, profile=profile)
+        if sensitivities and callback is not None:
+            msg = 'Callback is not available with sensitivities.'
+            raise ValueError(msg)
+
+        # Core loop for simulation and recording
+        start = clock.perf_counter()
+        steps = np.zeros(2, dtype=int)
+        if sensitivities:
+            blocks = self._sensitivities(time, init_state, method, rtol,
+                atol, steps)
+        else:
+            # Optional: integrate with a copy whose methods are timed
+            model = instrument(self, stats) if profile else self
+            blocks = model._integrate(time, init_state, method, rtol, atol,
+                steps, chunk=time.size, stats=stats, callback=callback)
+        traj = np.concatenate(list(blocks))
+        stats.n_steps = int(steps[0])
+        stats.finish(clock.perf_counter() - start)
+
+        # Display info about steps
+        if verb:
+            print(self._step_message(method, steps))
+
+        info = {}
+        if sensitivities:
+            n_genes = self.n_genes
+            traj, sens = traj[:, :n_genes], traj[:, n_genes:]
+            sens = sens.reshape((time.size, n_genes, -1))
+            info['sensitivities'] = self._split_parameters(sens)
+        meta = model_meta(self, method=method, n_steps=int(steps[0]),
+            n_evals=int(steps[1]), stats=stats, **info)
+        return Trajectory(time, traj, meta=meta)
+
+    def gradient(self, time, loss_gradient, init_state=None, verb=False,
+        method='RK45', rtol=1e-6, atol=1e-9):
+        """Gradient of a scalar loss of the trajectory (adjoint method).
+
+        The loss is a function of the trajectory at given time points, and
+        `loss_gradient(x)` returns its derivative with respect to `x`, with
+        shape (n_times, n_genes). After a forward simulation, the adjoint
+        state a' = -J^T a (with jumps given by `loss_gradient` at the time
+        points) is integrated backward together with the gradient g' = -F^T a,
+        so the cost does not depend on the number of parameters.
+
+        Return the trajectory and the gradient, a dict with keys
+        `PARAMETERS` and `init_state`, where the gradient for `inter` has
+        the format of `network.inter` (only stored entries if sparse).
+        """
+        if init_state is None:
+            init_state = np.zeros(self.n_genes)
+        if method not in EXPLICIT_METHODS + IMPLICIT_METHODS:
+            msg = 'Gradient requires an adaptive method.'
+            raise ValueError(msg)
+
+        # Check simulation parameters
+        time = utils.check_time_points(time).reshape((-1,))
+        init_state = utils.check_init_state(init_state, shape=(self.n_genes,))
+        n_genes = self.n_genes
+        n_params = 5*n_genes + self.inter_pattern()[0].size
+
+        # Forward pass with dense output
+        options = {}
+        if method in IMPLICIT_METHODS:
+            options['jac'] = _jacobian_option(method, self.jacobian)
+        if time[-1] > 0:
+            forward = solve_ivp(self.drift, (0, time[-1]), init_state,
+                method=method, dense_output=True, rtol=rtol, atol=atol,
+                **options)
+            if not forward.success:
+                raise RuntimeError(forward.message)
+            traj = forward.sol(time).T
+            n_forward = forward.nfev
+        else:
+            traj = np.tile(init_state, (time.size, 1))
+            n_forward = 0
+        jumps = np.array(loss_gradient(traj), dtype=float).reshape(traj.shape)
+
+        # Backward pass: adjoint state and gradient
+        def field(t, y):
+            x, a = forward.sol(t), y[:n_genes]
+            return np.concatenate([-self.jacobian(t, x).T @ a,
+                -self.parameter_jacobian(x).T @ a])
+
+        def jacobian(t, y):
+            x = forward.sol(t)
+            zero = csr_array((n_params, n_params))
+            return block_array([[-csr_array(self.jacobian(t, x)).T, None],
+                [-self.parameter_jacobian(x).T, zero]], format='csr')
+
+        if method in IMPLICIT_METHODS:
+            options['jac'] = _jacobian_option(method, jacobian)
+        y = np.zeros(n_genes + n_params)
+        n_backward = 0
+        for k in range(time.size - 1, -1, -1):
+            y[:n_genes] += jumps[k]
+            t_prev = time[k-1] if k > 0 else 0
+            if t_prev < time[k]:
+                sol = solve_ivp(field, (time[k], t_prev), y, method=method,
+                    rtol=rtol, atol=atol, **options)
+                if not sol.success:
+                    raise RuntimeError(sol.message)
+                y = sol.y[:, -1]
+                n_backward += sol.nfev
+
+        if verb:
+            print(f'Adjoint gradient of {n_params} parameters used '
+                f'{n_forward} forward and {n_backward} backward evaluations')
+
+        grad = self._split_parameters(y[n_genes:])
+        rows, cols = self.inter_pattern()
+        if issparse(self.network.inter):
+            grad['inter'] = csr_array((grad['inter'], (rows, cols)),
+                shape=(n_genes, n_genes))
+        else:
+            grad['inter'] = grad['inter'].reshape((n_genes, n_genes))
+        grad['init_state'] = y[:n_genes]
+        meta = model_meta(self, method=method, n_evals=n_forward + n_backward)
+        return Trajectory(time, traj, meta=meta), grad
+
+    def simulate_iter(self, time, init_state=None, verb=False,
+        method='euler', rtol=1e-6, atol=1e-9, chunk=1000):
+        """Perform simulation and yield the trajectory by blocks.
+
+        Yield pairs (t, x) where `t` contains at most `chunk` consecutive time
+        points and `x` the corresponding protein levels, so that memory usage
+        does not depend on the number of time points. Blocks can be written
+        to disk using the sinks of `models.recording`.
+        """
         if init_state is None:
             init_state = np.zeros(self.n_genes)
 
@@ -54,36 +293,307 @@ class LimitGRN:
         time = utils.check_time_points(time).reshape((-1,))
         init_state = utils.check_init_state(init_state, shape=(self.n_genes,))
 
-        # Set Euler step size
-        dt = 1e-3 / self.degradation_rate
+        # Core loop for simulation and recording
+        steps = np.zeros(2, dtype=int)
+        blocks = self._integrate(time, init_state, method, rtol, atol, steps,
+            chunk)
+        for start, block in zip(range(0, time.size, chunk), blocks):
+            yield time[start:start+chunk], block
+
+        # Display info about steps
+        if verb:
+            print(self._step_message(method, steps))
+
+    def _integrate(self, time, init_state, method, rtol, atol, steps, chunk,
+        stats=None, callback=None):
+        """Yield the trajectory by blocks of `chunk` time points.
+
+        The number of steps and drift evaluations is recorded in `steps`.
+        """
+        if method == 'euler':
+            return self._euler(time, init_state, steps, chunk, stats,
+                callback)
+        if method in EXPLICIT_METHODS + IMPLICIT_METHODS:
+            return self._adaptive(time, init_state, method, rtol, atol,
+                steps, chunk, stats, callback)
+        methods = ['euler'] + EXPLICIT_METHODS + IMPLICIT_METHODS
+        msg = f'Method must be one of: {", ".join(methods)}.'
+        raise ValueError(msg)
+
+    def _sensitivities(self, time, init_state, method, rtol, atol, steps):
+        """Solve the trajectory with forward sensitivities (single block).
+
+        Each row of the block contains the state followed by the flattened
+        sensitivity matrix of shape (n_genes, n_params).
+        """
+        n_genes = self.n_genes
+        n_params = 5*n_genes + self.inter_pattern()[0].size
 
-        # Initialize trajectory array
-        traj = np.zeros((time.size, self.n_genes))
+        def field(t, y):
+            x, s = y[:n_genes], y[n_genes:].reshape((n_genes, n_params))
+            ds = self.jacobian(t, x) @ s + self.parameter_jacobian(x).toarray()
+            return np.concatenate([self.drift(t, x), np.ravel(ds)])
+
+        y0 = np.concatenate([init_state, np.zeros(n_genes * n_params)])
+        block = np.zeros((time.size, y0.size))
+        if method == 'euler':
+            dt = 1e-3 / np.max(self.degradation_rate)
+            t, y = 0, y0
+            for k, time_k in enumerate(time):
+                while t < time_k:
+                    y = y + dt*field(t, y)
+                    t += dt
+                    steps += 1
+                block[k] = y
+            yield block
+            return
+        if method not in EXPLICIT_METHODS + IMPLICIT_METHODS:
+            methods = ['euler'] + EXPLICIT_METHODS + IMPLICIT_METHODS
+            msg = f'Method must be one of: {", ".join(methods)}.'
+            raise ValueError(msg)
+
+        # Approximate Jacobian (neglecting second derivatives)
+        def jacobian(t, y):
+            jac = csr_array(self.jacobian(t, y[:n_genes]))
+            return block_diag([jac, kron(jac, eye_array(n_params))],
+                format='csr')
+
+        options = {}
+        if method in IMPLICIT_METHODS:
+            options['jac'] = _jacobian_option(method, jacobian)
+        if time[-1] == 0:
+            yield np.tile(y0, (time.size, 1))
+            return
+        sol = solve_ivp(field, (0, time[-1]), y0, method=method,
+            dense_output=True, rtol=rtol, atol=atol, **options)
+        if not sol.success:
+            raise RuntimeError(sol.message)
+        steps += [sol.t.size - 1, sol.nfev]
+        yield sol.sol(time).T
+
+    def _step_message(self, method, steps):
+        """Describe the number of steps used by the integrator."""
+        if method == 'euler':
+            dt = 1e-3 / np.max(self.degradation_rate)
+            return (f'ODE simulation used {steps[0]} steps '
+                f'(step size = {dt:.5f})')
+        return (f'ODE simulation used {steps[0]} steps ({method} method, '
+            f'{steps[1]} drift evaluations)')
+
+    def _euler(self, time, init_state, steps, chunk, stats=None,
+        callback=None):
+        """Core loop of the Euler method."""
+        # Set Euler step size (shared by all genes)
+        dt = 1e-3 / np.max(self.degradation_rate)
 
         # Initialize current time and state
         t, x = 0, init_state
 
-        # Optional: record number of steps
-        c = 0
-
         # Core loop for simulation and recording
-        for k in range(time.size):
-            while t < time[k]:
+        for start in range(0, time.size, chunk):
 
-                x = self.euler_step(dt, x)
-                t += dt
+            # Initialize trajectory block
+            block = np.zeros((min(chunk, time.size - start), self.n_genes))
 
-                # Optional: record number of steps
-                c += 1
+            for k, time_k in enumerate(time[start:start+chunk]):
+                while t < time_k:
+
+                    x = self.euler_step(dt, x)
+                    t += dt
+
+                    # Optional: record number of steps
+                    steps += 1
+
+                # Record protein levels
+                block[k] = x
+                if callback is not None:
+                    stats.n_steps = int(steps[0])
+                    callback(time_k, x, stats)
 
-            # Record protein levels
-            traj[k] = x
+            yield block
+
+    def _adaptive(self, time, init_state, method, rtol, atol, steps, chunk,
+        stats=None, callback=None):
+        """Adaptive integration with dense output."""
+        options = {}
+        if method in IMPLICIT_METHODS:
+            options['jac'] = _jacobian_option(method, self.jacobian)
+
+        # Initialize current time and state
+        t, x = 0, init_state
+
+        # Integrate up to the end of each block
+        for start in range(0, time.size, chunk):
+            time_block = time[start:start+chunk]
+            if time_block[-1] == t:
+                yield np.tile(x, (time_block.size, 1))
+                continue
+            sol = solve_ivp(self.drift, (t, time_block[-1]), x,
+                method=method, dense_output=True, rtol=rtol, atol=atol,
+                **options)
+            if not sol.success:
+                raise RuntimeError(sol.message)
+            steps += [sol.t.size - 1, sol.nfev]
+            t, x = time_block[-1], sol.y[:, -1]
+            block = sol.sol(time_block).T
+            if callback is not None:
+                stats.n_steps = int(steps[0])
+                for time_k, x_k in zip(time_block, block):
+                    callback(time_k, x_k, stats)
+            yield block
+
+    def simulate_batch(self, time, init_state=None, verb=False,
+        method='euler', rtol=1e-6, atol=1e-9, **params):
+        """Simulate a batch of initial states and/or parameter values.
+
+        The batch is integrated in lockstep as a single vectorized ODE system.
+        Initial states have shape (n_batch, n_genes) and optional keyword
+        arguments `burst_size`, `degradation_rate`, `burst_frequency_min` and
+        `burst_frequency_max` give per-batch parameter values with shape
+        (n_batch,). The trajectory array `x` has shape
+        (n_batch, n_times, n_genes).
+        """
+        batch = _Batch(self, init_state, params)
+
+        # Check simulation parameters
+        time = utils.check_time_points(time).reshape((-1,))
+
+        if method == 'euler':
+            traj, c, dt = batch.euler(time)
+            msg = f'ODE simulation used {c} steps (step size = {dt:.5f})'
+        elif method in EXPLICIT_METHODS + IMPLICIT_METHODS:
+            traj, c, n_eval = batch.adaptive(time, method, rtol, atol)
+            msg = (f'ODE simulation used {c} steps ({method} method, '
+                f'{n_eval} drift evaluations)')
+        else:
+            methods = ['euler'] + EXPLICIT_METHODS + IMPLICIT_METHODS
+            msg = f'Method must be one of: {", ".join(methods)}.'
+            raise ValueError(msg)
 
         # Display info about steps
         if verb:
-            print(f'ODE simulation used {c} steps (step size = {dt:.5f})')
+            print(f'{msg} for a batch of size {batch.size}')
+
+        meta = model_meta(self, method=method, n_steps=int(c),
+            batch_params=params)
+        return TrajectoryBatch(time, traj, meta=meta)
+
+
+class _Batch:
+    """Vectorized limit model for a batch of states and parameters."""
 
-        return Trajectory(time, traj)
+    def __init__(self, model: LimitGRN, init_state, params):
+        n_genes = model.n_genes
+        names = ['burst_size', 'degradation_rate',
+            'burst_frequency_min', 'burst_frequency_max']
+        for name in params:
+            if name not in names:
+                msg = f'Unknown parameter {name!r}.'
+                raise ValueError(msg)
+
+        # Batch size given by initial states or parameters
+        sizes = [np.size(params[name]) for name in params]
+        if init_state is not None:
+            init_state = utils.check_init_state(init_state)
+            if np.ndim(init_state) == 2:
+                sizes.append(init_state.shape[0])
+        size = max(sizes, default=1)
+
+        # Parameters have shape (n_batch, 1) or model shape
+        for name in names:
+            if name in params:
+                value = np.array(params[name], dtype=float).reshape((-1, 1))
+                if value.shape[0] != size:
+                    msg = f'Parameter {name!r} must have shape ({size},).'
+                    raise ValueError(msg)
+            else:
+                value = getattr(model, name)
+            setattr(self, name, value)
+
+        if init_state is None:
+            init_state = np.zeros(n_genes)
+        if np.shape(init_state) not in [(n_genes,), (size, n_genes)]:
+            msg = f'Initial state must have shape ({size}, {n_genes}).'
+            raise ValueError(msg)
+
+        self.model = model
+        self.size = size
+        self.init_state = np.zeros((size, n_genes)) + init_state
+
+    def drift(self, x):
+        """Vector field of the limit model (batch version)."""
+        k0 = self.burst_frequency_min
+        k1 = self.burst_frequency_max
+        basal = self.model.network.basal
+        inter = self.model.network.inter
+        kon = kon_sigmoid(x, k0, k1, basal, inter)
+        return self.burst_size*kon - self.degradation_rate*x
+
+    def jacobian(self, x):
+        """Jacobian matrix of the vector field (block diagonal)."""
+        k0 = self.burst_frequency_min
+        k1 = self.burst_frequency_max
+        basal = self.model.network.basal
+        inter = self.model.network.inter
+        shape = x.shape + (1,)
+        burst_size = np.broadcast_to(self.burst_size, x.shape).reshape(shape)
+        degradation_rate = np.broadcast_to(self.degradation_rate, x.shape)
+        jac = burst_size * kon_sigmoid_jacobian(x, k0, k1, basal, inter)
+        i = np.arange(x.shape[1])
+        jac[:, i, i] -= degradation_rate
+        indices = np.arange(self.size)
+        indptr = np.arange(self.size + 1)
+        return bsr_array((jac, indices, indptr), shape=(x.size, x.size))
+
+    def euler(self, time):
+        """Euler method (batch version)."""
+        dt = 1e-3 / np.max(self.degradation_rate)
+        traj = np.zeros((self.size, time.size, self.init_state.shape[1]))
+        t, x = 0, self.init_state
+        c = 0
+        for k in range(time.size):
+            while t < time[k]:
+                x = x + dt*self.drift(x)
+                t += dt
+                c += 1
+            traj[:, k] = x
+        return traj, c, dt
+
+    def adaptive(self, time, method, rtol, atol):
+        """Adaptive integration with dense output (batch version)."""
+        shape = self.init_state.shape
+        if time[-1] == 0:
+            traj = np.repeat(self.init_state[:, None], time.size, axis=1)
+            return traj, 0, 0
+
+        def drift(t, y):
+            return self.drift(y.reshape(shape)).reshape(-1)
+
+        def jacobian(t, y):
+            return self.jacobian(y.reshape(shape))
+
+        options = {}
+        if method in IMPLICIT_METHODS:
+            options['jac'] = _jacobian_option(method, jacobian)
+        y0 = self.init_state.reshape(-1)
+        sol = solve_ivp(drift, (0, time[-1]), y0, method=method,
+            dense_output=True, rtol=rtol, atol=atol, **options)
+        if not sol.success:
+            raise RuntimeError(sol.message)
+        traj = sol.sol(time).T.reshape((time.size,) + shape)
+        return traj.transpose((1, 0, 2)), sol.t.size - 1, sol.nfev
+
+
+def _jacobian_option(method, jacobian):
+    """Jacobian for `solve_ivp` (LSODA does not accept sparse matrices)."""
+    if method != 'LSODA':
+        return jacobian
+
+    def dense_jacobian(t, x):
+        jac = jacobian(t, x)
+        return jac.toarray() if issparse(jac) else jac
+
+    return dense_jacobian
 
 
 # Tests
@@ -96,3 +606,19 @@ if __name__ == '__main__':
     sim = model.simulate(time, init_state, verb=True)
     print(sim.t)
     print(sim.x)
+    # Adaptive integration
+    sim = model.simulate(time, init_state, verb=True, method='RK45')
+    print(sim.x)
+    sim = model.simulate(time, init_state, verb=True, method='Radau')
+    print(sim.x)
+    # Batch of initial states and parameter values
+    init_state = np.random.default_rng(0).uniform(0, 2, size=(5, 2))
+    k1 = np.linspace(1, 3, 5)
+    sim = model.simulate_batch(time, init_state, verb=True, method='RK45',
+        burst_frequency_max=k1)
+    print(sim.x[:, -1])
+    # Forward sensitivities and adjoint gradient of a quadratic loss
+    sim = model.simulate(time, [1, 0], method='RK45', sensitivities=True)
+    print(sim.meta['sensitivities']['basal'][-1])
+    sim, grad = model.gradient(time, lambda x: x - 1, [1, 0], verb=True)
+    print(grad['basal'], grad['inter'])
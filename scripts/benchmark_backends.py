@@ -0,0 +1,38 @@
+"""Compare NumPy and Numba backends of the exact simulation methods."""
+import time as clock
+import numpy as np
+from models.networks import repressilator
+from models_solution import BurstyBase, BurstyGRN
+from models_solution._compiled import HAS_NUMBA
+
+
+def benchmark(simulate, n_runs=5):
+    """Return the best wall time of several runs (after a warm-up run)."""
+    simulate()
+    times = []
+    for _ in range(n_runs):
+        start = clock.perf_counter()
+        simulate()
+        times.append(clock.perf_counter() - start)
+    return np.min(times)
+
+
+if not HAS_NUMBA:
+    print('Numba is not installed: both backends use NumPy.')
+
+# Long trajectories with a dense time grid
+time = np.linspace(0, 1000, 10000)
+models = [
+    ('BurstyBase', BurstyBase(burst_frequency=10)),
+    ('BurstyGRN (repressilator)', BurstyGRN(repressilator)),
+]
+
+for name, model in models:
+    timing = {}
+    for backend in ['numpy', 'numba']:
+        def simulate():
+            return model.simulate(time, seed=0, backend=backend)
+        timing[backend] = benchmark(simulate)
+    speedup = timing['numpy'] / timing['numba']
+    print(f'{name}: numpy {timing["numpy"]:.4f}s, '
+        f'numba {timing["numba"]:.4f}s (speedup x{speedup:.1f})')
@@ -3,6 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from harissa import NetworkModel
 from harissa.utils import build_pos, plot_network
+from models.moments import group_moments
 
 # Path of result files
 result_path = 'results/pathways_'
@@ -66,13 +67,10 @@ np.savetxt(result_path + 'data2.txt', data2, fmt='%d', delimiter='\t')
 # Plot mean trajectories #
 
 for i, data in [(1, data1), (2, data2)]:
-    # Import time points
-    time = np.sort(list(set(data[:, 0])))
+    # Average for each time point (single pass over cells)
+    moments = group_moments(data[:, 0], data[:, 1:])
+    time, traj = moments.groups, moments.mean
     T = np.size(time)
-    # Average for each time point
-    traj = np.zeros((T, G))
-    for k, t in enumerate(time):
-        traj[k] = np.mean(data[data[:, 0] == t, 1:], axis=0)
     # Draw trajectory and export figure
     fig = plt.figure(figsize=(8, 2))
     labels = [rf'$\langle M_{i+1} \rangle$' for i in range(G)]